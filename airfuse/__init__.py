@@ -1,6 +1,6 @@
 import logging
 
-__version__ = '0.7.5'
+__version__ = '0.8.0'
 changelog = '''
 * 0.1.0: functioning
 * 0.2.0: checks for invalid aVNA_AN and aVNA_PA and updates weights accordingly
@@ -45,6 +45,21 @@ changelog = '''
 * 0.7.4: * Fixed install_requires
 * 0.7.5: * Updating requirements.txt and install_requires to prevent numpy 2
            and fixing new matplotlib registry issue.
+* 0.8.0: * Added -f parquet output option (requires pyarrow) and -j/--njobs
+           to apply fusion models concurrently with threads.
+         * NAQFC archive paths ending in .zarr are stored as Zarr (requires
+           zarr); other paths are stored as compressed NetCDF.
+         * Added idw_maxdist to get_fusions to ignore IDW neighbors beyond a
+           distance; points without a neighbor in range are NaN.
+         * Added style binners (epa_aqi_bin, epa_pmaqi_bin, epa_pmaqi2_bin,
+           epa_o3aqi_bin, epa_o3aqi2_bin) to classify whole rasters.
+         * Operational NAQFC sources (nomads, ncep, nws) are probed at once
+           and only the most preferred available file is downloaded.
+         * Decoded operational NAQFC hours (%Y/%m/%d/aqm.t..z.*.nc) and AirNow
+           files (files.airnowtech.org/...) are cached under the working
+           directory. Set AIRFUSE_CACHEDIR to another directory to relocate
+           the caches or to none to disable them.
+         * Requires pyproj>=3.1 (thread-safe transformers).
 '''
 
 __doc__ = '''
@@ -122,7 +137,7 @@ pandas>=1.1.5
 numpy>=1.19.5
 scipy>=1.5.4
 netCDF4>=1.5.8
-pyproj>=2.6.1
+pyproj>=3.1
 cfgrib
 eccodes==1.2.0
 ecmwflibs
@@ -145,7 +160,7 @@ pandas>=1.1.5
 numpy>=1.19.5
 scipy>=1.5.4
 netCDF4>=1.5.8
-pyproj>=2.6.1
+pyproj>=3.1
 cfgrib
 eccodes==1.2.0
 ecmwflibs
@@ -2,9 +2,8 @@ __all__ = ['fuse']
 
 from .mod import get_model
 from .obs import pair_airnow, pair_aqs, pair_purpleair
-from .models import applyfusion, get_fusions
-from .util import df2nc
-import time
+from .models import applyfusions, get_fusions
+from .util import df2nc, valid_dataframe
 import pyproj
 import os
 import logging
@@ -15,7 +14,8 @@ import warnings
 
 def fuse(
     obssource, species, startdate, model, bbox=None, cv_only=False,
-    outdir=None, overwrite=False, api_key=None, verbose=0, **kwds
+    outdir=None, overwrite=False, api_key=None, verbose=0, njobs=None,
+    **kwds
 ):
     """
     Arguments
@@ -28,6 +28,8 @@ def fuse(
     cv_only : bool
     outdir : str or None
     overwrite : bool
+    njobs : int or None
+        If provided, fusion models are applied concurrently (joblib threads)
 
     Returns
     -------
@@ -56,11 +58,13 @@ def fuse(
     fusepath = f'{stem}.{outfmt}'
     outpaths = {'outpath': fusepath, 'evalpath': cvpath, 'logpath': logpath}
 
-    found = {k: os.path.exists(p) for k, p in outpaths.items()}
     chks = ['evalpath', 'outpath']
 
-    if any([found[k] for k in chks]) and not overwrite:
-        foundstr = ' '.join([outpaths[k] for k, v in found.items() if v])
+    # Stop at the first existing output; only list all outputs to warn
+    if not overwrite and any(os.path.exists(outpaths[k]) for k in chks):
+        foundstr = ' '.join(
+            [p for p in outpaths.values() if os.path.exists(p)]
+        )
         warnings.warn(
             f'Outputs exist; delete or use -O to continue:\n{foundstr}'
         )
@@ -99,7 +103,7 @@ def fuse(
         k: dict(description=v, units=units)
         for k, v in vardescs.items()
     }
-    nowstr = pd.to_datetime('now', utc=True).strftime('%Y-%m-%dT%H:%M:%S%z')
+    nowstr = pd.Timestamp.now(tz='UTC').strftime('%Y-%m-%dT%H:%M:%S%z')
     fdesc = f"""Fusion of observations (AirNow and PurpleAir) using residual
 interpolation and correction of the NOAA NAQFC forecast model. The bias is
 estimated in real-time using AirNow and PurpleAir measurements. It is
@@ -119,19 +123,13 @@ updated: {nowstr}
     if cv_only:
         tgtdf = None
     else:
-        outdf = modvar.to_dataframe().reset_index()
-        tgtdf = outdf.query(f'{modvar.name} == {modvar.name}').copy()
+        tgtdf = valid_dataframe(modvar)
 
     # Apply all models to observations
-    for mkey, mod in models.items():
-        logging.info(f'{obssource} {mkey} start')
-        t0 = time.time()
-        applyfusion(
-            mod, mkey, obsdf, tgtdf=tgtdf, obskey=obskey, modkey=modvar.name,
-            verbose=9
-        )
-        t1 = time.time()
-        logging.info(f'{obssource} {mkey} finish: {t1 - t0:.0f}s')
+    applyfusions(
+        models, obsdf, tgtdf=tgtdf, njobs=njobs, obskey=obskey,
+        modkey=modvar.name, verbose=9
+    )
 
     # Save results to disk
     obsdf.to_csv(cvpath, index=False)
@@ -148,8 +146,10 @@ updated: {nowstr}
                 'sigma': metarow['sigma'],
                 'updated': nowstr
             }
-            tgtds = df2nc(tgtdf, varattrs, fileattrs)
-            tgtds.to_netcdf(fusepath)
+            df2nc(tgtdf, varattrs, fileattrs, outpath=fusepath)
+        elif fusepath.endswith('.parquet'):
+            # requires pyarrow or fastparquet
+            tgtdf.to_parquet(fusepath, index=False)
         else:
             # Defualt to csv
             tgtdf.to_csv(fusepath, index=False)
@@ -1,4 +1,4 @@
-__all__ = ['WeightedEnsemble', 'distweight']
+__all__ = ['WeightedEnsemble', 'distweight', 'distweights']
 
 
 def distweight(
@@ -37,33 +37,89 @@ def distweight(
     outdf : pandas.DataFrame
         Dataframe with weights and final fused product
     """
-    import numpy as np
-    rename = dict(zip(distkeys, valkeys))
-    dists = df[distkeys].rename(columns=rename)
-    vals = df[valkeys]
-    wgts = (dists**power).where(~vals.isna()).fillna(0)
-    # If a distance was zero, set weight to huge
-    wgts = wgts.where(wgts != np.inf).fillna(1e20)
-    for scalekey, scaleval in scale_kw.items():
-        wgts[scalekey] = wgts[scalekey] * scaleval
-
-    mindist = dists.min(axis=1)
-    totwgt = wgts.sum(axis=1)
-    nwgts = wgts.divide(totwgt, axis=0).fillna(0)
-    bc_wgt = L / (1 + np.exp(k * (mindist - x0)))
-    bc_wgt = bc_wgt.where(totwgt > 0).fillna(0)
-    outdf = nwgts.multiply(bc_wgt, axis=0)
-    outdf[modkey] = (1 - bc_wgt)
-    y = (outdf[valkeys + [modkey]] * df[valkeys + [modkey]]).sum(axis=1).where(
-        ~df[modkey].isna()
+    outdfs = distweights(
+        df, distkeys, [valkeys], [ykey], modkey=modkey, power=power,
+        add=add, L=L, k=k, x0=x0, **scale_kw
     )
-    outdf = outdf.rename(columns=lambda x: x + '_WGT')
-    outdf[ykey] = y
-    if add:
-        for key in outdf.columns:
-            df[key] = outdf[key]
+    return outdfs[0]
+
+
+def distweights(
+    df, distkeys, valkeyss, ykeys, modkey='NAQFC', power=-2, add=True,
+    L=1, k=0.3, x0=125, **scale_kw
+):
+    """
+    Same as distweight for several lists of value keys that share distkeys
+    (e.g., aVNA, eVNA, and aIDW each from AirNow and PurpleAir). The
+    distance weights and the logistic model weight are calculated once and
+    reused for each output.
+
+    Arguments
+    ---------
+    df : pandas.DataFrame
+    distkeys : iterable
+        List of distance keys
+    valkeyss : iterable
+        List of value key lists (each in the same order as distkeys)
+    ykeys : iterable
+        Name for each weighted output (same order as valkeyss)
+    modkey, power, add, L, k, x0 : see distweight
+    scale_kw : mappable
+        If provided, each key must be in at least one of valkeyss and is used
+        to scale the nominal weights of values from that valkey
+
+    Results
+    -------
+    outdfs : list
+        Dataframe with weights and final fused product for each ykey
+    """
+    import numpy as np
+    import pandas as pd
+
+    valkeyss = [list(valkeys) for valkeys in valkeyss]
+    allvalkeys = set().union(*valkeyss)
+    for scalekey in scale_kw:
+        if scalekey not in allvalkeys:
+            raise KeyError(scalekey)
+
+    distdf = df[distkeys]
+    with np.errstate(divide='ignore', over='ignore', invalid='ignore'):
+        dwgts = distdf.to_numpy() ** power
+        mindist = distdf.min(axis=1).to_numpy()
+        bc_wgt = L / (1 + np.exp(k * (mindist - x0)))
+
+    modvals = df[modkey].to_numpy()
+    modnull = np.isnan(modvals)
+    outdfs = []
+    for valkeys, ykey in zip(valkeyss, ykeys):
+        vals = df[valkeys].to_numpy()
+        wgts = np.where(np.isnan(vals) | np.isnan(dwgts), 0, dwgts)
+        # If a distance was zero, set weight to huge
+        wgts = np.where(wgts == np.inf, 1e20, wgts)
+        for vi, valkey in enumerate(valkeys):
+            if valkey in scale_kw:
+                wgts[:, vi] = wgts[:, vi] * scale_kw[valkey]
+
+        totwgt = wgts.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            nwgts = wgts / totwgt[:, None]
+        nwgts = np.where(np.isnan(nwgts), 0, nwgts)
+        bcw = np.where((totwgt > 0) & ~np.isnan(bc_wgt), bc_wgt, 0)
+        outwgts = np.column_stack([nwgts * bcw[:, None], 1 - bcw])
+        # NaN values have zero weight and are skipped like DataFrame.sum
+        y = np.nansum(outwgts * np.column_stack([vals, modvals]), axis=1)
+        y = np.where(modnull, np.nan, y)
+        outdf = pd.DataFrame(
+            outwgts, index=df.index,
+            columns=[key + '_WGT' for key in valkeys + [modkey]]
+        )
+        outdf[ykey] = y
+        if add:
+            for key in outdf.columns:
+                df[key] = outdf[key]
+        outdfs.append(outdf)
 
-    return outdf
+    return outdfs
 
 
 class WeightedEnsemble():
@@ -33,32 +33,25 @@ def get_constant(
         DataArray with values at cell centers and a projection stored as
         the attribute crs_proj4
     """
-    from .naqfc import getgrid, addcrs
+    from .naqfc import getgrid, addcrs, bboxslices
     import numpy as np
     import pandas as pd
-    import xarray as xr
-    import pyproj
 
     gridds = getgrid()
     addcrs(gridds)
-    vals = np.zeros((gridds.sizes['y'], gridds.sizes['x']), dtype='f')
-    vals[:] = default
+    # Read-only view of one value; no grid-sized allocation
+    vals = np.broadcast_to(
+        np.float32(default), (gridds.sizes['y'], gridds.sizes['x'])
+    )
     gridds['constant'] = (('y', 'x'), vals)
     var = gridds['constant']
     if bbox is not None:
-        # Find lon/lat coordinates of projected cell centroids
-        proj = pyproj.Proj(gridds.attrs['crs_proj4'])
-        Y, X = xr.broadcast(var.y, var.x)
-        LON, LAT = proj(X.values, Y.values, inverse=True)
-        LON = X * 0 + LON
-        LAT = Y * 0 + LAT
-        # Find projected box covering lon/lat box
-        inlon = ((LON >= bbox[0]) & (LON <= bbox[2])).any('y')
-        inlat = ((LAT >= bbox[1]) & (LAT <= bbox[3])).any('x')
-        var = var.sel(x=inlon, y=inlat)
+        # Find projected box covering lon/lat box from the grid edges
+        xslice, yslice = bboxslices(gridds.crs_proj4, var.x, var.y, bbox)
+        var = var.isel(x=xslice, y=yslice)
 
     var.name = key
-    var.coords['reftime'] = pd.to_datetime('now', utc=True)
+    var.coords['reftime'] = pd.Timestamp.now(tz='UTC')
     var.coords['sigma'] = 1.0
     var.coords['time'] = pd.to_datetime(bdate)
     var.attrs['crs_proj4'] = gridds.crs_proj4
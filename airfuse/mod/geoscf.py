@@ -80,6 +80,6 @@ def get_mostrecent(
         xi = np.linspace(var.x.min(), var.x.max(), (var.x.size - 1) * 4 + 1)
         yi = np.linspace(var.y.min(), var.y.max(), (var.y.size - 1) * 4 + 1)
         var = var.interp(x=xi, y=yi)
-    nowstr = pd.to_datetime('now', utc=True).strftime('%Y-%m-%dT%H:%M:%S')
+    nowstr = pd.Timestamp.now(tz='UTC').strftime('%Y-%m-%dT%H:%M:%S')
     var.attrs['description'] = f'{fileurl} (retrieved: {nowstr}Z)'
     return var
@@ -82,10 +82,11 @@ def get_goesgwr(
         Hour of data to retrieve for GOES.
     key : str
         Species to retrieve
-    varkey : str
+    varkey : str or list
         Choices 'pm25gwr_ge', 'pm25gwr_gw', 'pm25dnn_ge', 'pm25dnn_gw'
         gwr is base geographic weighted regression
         dnn is the deep neural network update
+        A list of keys is read from one file (dnn if any key is dnn)
     bbox : tuple
         Defaults to None, which is all data returned
         Otherwise provide bounding box (swlon, swlat, nelon, nelat) in degrees
@@ -96,17 +97,18 @@ def get_goesgwr(
 
     Returns
     -------
-    var : xr.DataArray
+    var : xr.DataArray or list
         DataArray with values at cell centers and a projection stored as
-        the attribute crs_proj4
+        the attribute crs_proj4. If varkey is a list, one per varkey.
     """
     from ..util import get_file
     import pandas as pd
 
     bdate = pd.to_datetime(bdate)
+    varkeys = [varkey] if isinstance(varkey, str) else list(varkey)
     server = 'www.star.nesdis.noaa.gov'
     urlroot = f'https://{server}/pub/smcd/hzhang/GOES/GOES-16/NRT/CONUS'
-    if 'dnn' in varkey:
+    if any('dnn' in k for k in varkeys):
         filename = f'{bdate:pm25dnn/%Y%m%d/pm25_gwr_aod_exp50_%Y%m%d%H_dnn.nc}'
         localpath = f'{bdate:%Y/%m/%d/pm25_gwr_aod_exp50_%Y%m%d%H_dnn.nc}'
     else:
@@ -118,18 +120,24 @@ def get_goesgwr(
     remotepath = f'{urlroot}/{filename}'
     get_file(remotepath, localpath)
     gwrf = open_goes(localpath)
-    if varkey.endswith('_ge'):
-        da = gwrf[varkey].rename(xdim_ge='x', ydim_ge='y')
-        da.attrs['crs_proj4'] = ge_proj4
-    elif varkey.endswith('_gw'):
-        da = gwrf[varkey].rename(xdim_gw='x', ydim_gw='y')
-        da.attrs['crs_proj4'] = gw_proj4
-    else:
-        raise KeyError(f'Variable keys must end in _ge or _gw; got {varkey}')
-
-    nowstr = pd.to_datetime('now', utc=True).strftime('%Y-%m-%dT%H:%M:%S')
-    da.attrs['description'] = f'{remotepath} (retrieved: {nowstr}Z)'
-    return da
+    nowstr = pd.Timestamp.now(tz='UTC').strftime('%Y-%m-%dT%H:%M:%S')
+    das = []
+    for vkey in varkeys:
+        if vkey.endswith('_ge'):
+            da = gwrf[vkey].rename(xdim_ge='x', ydim_ge='y')
+            da.attrs['crs_proj4'] = ge_proj4
+        elif vkey.endswith('_gw'):
+            da = gwrf[vkey].rename(xdim_gw='x', ydim_gw='y')
+            da.attrs['crs_proj4'] = gw_proj4
+        else:
+            raise KeyError(f'Variable keys must end in _ge or _gw; got {vkey}')
+
+        da.attrs['description'] = f'{remotepath} (retrieved: {nowstr}Z)'
+        das.append(da)
+
+    if isinstance(varkey, str):
+        return das[0]
+    return das
 
 
 def open_goes(path):
@@ -1,8 +1,65 @@
 __all__ = ['open_mostrecent', 'get_mostrecent', 'open_operational']
 
+import functools
 import logging
+import pandas as pd
 logger = logging.getLogger(__name__)
 
+# Fixed offsets used for every file; built once rather than parsed per call
+_onehour = pd.Timedelta(hours=1)
+# Times are shifted from the end of the hour to the middle of the hour
+_tomidhour = pd.Timedelta(minutes=-30)
+# NCEI catalogs younger than this may still be incomplete
+_catalogrecent = pd.Timedelta(days=3)
+
+# NDGD product (first 6 characters of key) names used by the NCEI archive
+# (varkey), the NCEP/NOMADS (ncepcode) and NWS (nwscode) servers, and the
+# cfgrib decoded variable (oldkey). LOPZ99 and YBPZ99 are bias corrected.
+_pmmeta = dict(
+    oldkey='pmtf', varkey='Particulate_matter_fine_sigma_1_Hour_Average',
+    nwscode='apm25h01', ncepcode='ave_1hr_pm25'
+)
+_o3meta = dict(
+    oldkey='ozcon', varkey='Ozone_Concentration_sigma_1_Hour_Average',
+    nwscode='ozone01', ncepcode='ave_1hr_o3'
+)
+_keymeta = {
+    'LZQZ99': _pmmeta,
+    'LOPZ99': dict(
+        _pmmeta, nwscode=_pmmeta['nwscode'] + '_bc',
+        ncepcode=_pmmeta['ncepcode'] + '_bc'
+    ),
+    'LYUZ99': _o3meta,
+    'YBPZ99': dict(
+        _o3meta, nwscode=_o3meta['nwscode'] + '_bc',
+        ncepcode=_o3meta['ncepcode'] + '_bc'
+    ),
+}
+
+# ncep and nomads serve identical AQM products with the same layout
+_aqmroots = {
+    'ncep': 'https://ftp.ncep.noaa.gov/data/nccf/com/aqm/prod',
+    'nomads': 'https://nomads.ncep.noaa.gov/pub/data/nccf/com/aqm/prod',
+}
+
+
+def getkeymeta(key):
+    """
+    Arguments
+    ---------
+    key : str
+        NDGD key (e.g., LZQZ99_KWBP, LOPZ99_KWBP, LYUZ99_KWBP, YBPZ99_KWBP)
+
+    Returns
+    -------
+    meta : dict
+        oldkey, varkey, nwscode, and ncepcode for key
+    """
+    try:
+        return _keymeta[key[:6]]
+    except KeyError:
+        raise KeyError(f'{key} unknown try LZQZ99_KWBP or LYUZ99_KWBP.')
+
 
 def getpaths(date, key, service='fileServer'):
     """
@@ -18,9 +75,6 @@ def getpaths(date, key, service='fileServer'):
     paths : list
         List of paths to files on the NAQFC server.
     """
-    import xml.etree.ElementTree
-    import requests
-    import pandas as pd
     import os
 
     pdate = pd.to_datetime(date)
@@ -33,29 +87,103 @@ def getpaths(date, key, service='fileServer'):
     if os.environ.get('NDGD_HISTORICAL', 'F')[:1] in ('T', 'Y', 't', 'y'):
         croot = f'{croot}/historical'
     catalogurl = f'{croot}/{pdate:%Y%m/%Y%m%d}/catalog.xml'
-    r = requests.get(catalogurl)
-    et = xml.etree.ElementTree.fromstring(r.text)
-    datasets = []
-    for p in et:
-        for c in p:
-            if c.tag.endswith('dataset'):
-                url = c.attrib.get('urlPath', 'none')
-                if key in url:
-                    datasets.append(url)
+    # Catalogs for recent days still grow as files are archived, so they are
+    # re-read rather than memoized.
+    now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+    recent = (now - pdate.tz_localize(None).floor('1d')) < _catalogrecent
+    datasets = [
+        p for p in getcatalog(catalogurl, cache=not recent) if key in p
+    ]
     return [
         f'https://www.ncei.noaa.gov/thredds/{service}/' + p
-        for p in sorted(datasets)
+        for p in datasets
     ]
 
 
+def getcatalog(catalogurl, cache=True):
+    """
+    Retrieve and parse a THREDDS catalog. With cache, results are cached
+    in-process, so repeated calls for the same day (e.g., each key or
+    failback) only hit the server once.
+
+    Arguments
+    ---------
+    catalogurl : str
+        Path to a THREDDS catalog.xml
+    cache : bool
+        If True, reuse a previously parsed catalog. Use False for catalogs
+        that may still be updated (e.g., the last few days).
+
+    Returns
+    -------
+    urlpaths : tuple
+        Sorted urlPath attributes of all datasets in the catalog.
+    """
+    if cache:
+        return _getcatalog(catalogurl)
+    return _readcatalog(catalogurl)
+
+
+@functools.lru_cache(maxsize=32)
+def _getcatalog(catalogurl):
+    """Cached implementation of getcatalog"""
+    return _readcatalog(catalogurl)
+
+
+def _readcatalog(catalogurl):
+    """Uncached implementation of getcatalog"""
+    from ..util import get_session
+
+    r = get_session().get(catalogurl, timeout=(5, 60))
+    r.raise_for_status()
+    try:
+        import lxml.etree
+    except ImportError:
+        # lxml is optional; ElementTree gives the same result more slowly
+        import xml.etree.ElementTree
+        et = xml.etree.ElementTree.fromstring(r.content)
+        urlpaths = [
+            c.attrib['urlPath'] for c in et.iter()
+            if c.tag.endswith('dataset') and 'urlPath' in c.attrib
+        ]
+    else:
+        parser = lxml.etree.XMLParser(collect_ids=False)
+        et = lxml.etree.fromstring(r.content, parser)
+        urlpaths = [
+            str(p) for p in
+            et.xpath('//*[local-name()="dataset"]/@urlPath')
+        ]
+    return tuple(sorted(urlpaths))
+
+
 def getgrid(key='LZQZ99_KWBP'):
+    """
+    Get the grid definition (x, y, and LambertConformal_Projection) for key.
+    The grid is read once per process; callers receive a shallow copy that
+    they may modify.
+
+    Arguments
+    ---------
+    key : str
+        NCEP code for forecast (e.g., LZQZ99_KWBP)
+
+    Returns
+    -------
+    gridds : xr.Dataset
+        Dataset with x, y and LambertConformal_Projection
+    """
+    return _getgrid(key).copy()
+
+
+@functools.lru_cache(maxsize=8)
+def _getgrid(key):
     """
     key : str
         NCEP code for forecast (e.g., LZQZ99_KWBP)
     """
     import os
     import xarray as xr
-    import requests
+    from ..util import get_session
 
     gridpath = f'{key}_GRID.nc'
     if not os.path.exists(gridpath):
@@ -80,7 +208,7 @@ def getgrid(key='LZQZ99_KWBP'):
                 'https://raw.githubusercontent.com/barronh/airfuse/main/grid/'
                 + f'{gridkey}_GRID.nc'
             )
-            r = requests.get(expath)
+            r = get_session().get(expath, timeout=(5, 60))
             r.raise_for_status()
             with open(gridpath, 'wb') as gridf:
                 gridf.write(r.content)
@@ -103,14 +231,126 @@ def addcrs(naqfcf):
     -------
     None
     """
+    # Default projection is in m, but coordinate data is in km
+    srs = cf2srs(naqfcf['LambertConformal_Projection'].attrs)
+    # Use km units (consistent with x/y)
+    naqfcf.attrs['crs_proj4'] = srs.replace('+units=m', '+to_meter=1000')
+
+
+def cf2srs(attrs):
+    """
+    Convert Climate Forecasting grid mapping attributes to a PROJ string.
+
+    Arguments
+    ---------
+    attrs : mappable
+        CF grid mapping attributes (e.g., LambertConformal_Projection.attrs)
+
+    Returns
+    -------
+    srs : str
+        PROJ string in m as provided by pyproj.Proj.srs
+    """
+    import numpy as np
+
+    items = tuple(sorted(
+        (k, tuple(np.ravel(v).tolist()) if np.ndim(v) > 0 else v)
+        for k, v in attrs.items()
+    ))
+    return _cf2srs(items)
+
+
+@functools.lru_cache(maxsize=8)
+def _cf2srs(items):
+    """Cached implementation of cf2srs; items is a sorted tuple of attrs"""
     import pyproj
 
     # Build CRS in m from CF convention mapping variable attributes
-    crs = pyproj.CRS.from_cf(naqfcf['LambertConformal_Projection'].attrs)
-    # Default projection is in m, but coordinate data is in km
-    proj = pyproj.Proj(crs)
-    # Use km units (consistent with x/y)
-    naqfcf.attrs['crs_proj4'] = proj.srs.replace('+units=m', '+to_meter=1000')
+    crs = pyproj.CRS.from_cf(dict(items))
+    return pyproj.Proj(crs).srs
+
+
+def getinvtransformer(srs):
+    """
+    Get a cached transformer from projected coordinates to the longitude and
+    latitude of the projection's own geodetic CRS (equivalent to
+    pyproj.Proj(srs)(x, y, inverse=True)).
+
+    Arguments
+    ---------
+    srs : str
+        PROJ string (e.g., crs_proj4 attribute)
+
+    Returns
+    -------
+    transformer : pyproj.Transformer
+        Transformer with always_xy=True; transform(x, y) returns lon, lat
+    """
+    return _getinvtransformer(srs)
+
+
+@functools.lru_cache(maxsize=8)
+def _getinvtransformer(srs):
+    """Cached implementation of getinvtransformer"""
+    import pyproj
+
+    crs = pyproj.CRS.from_user_input(srs)
+    return pyproj.Transformer.from_crs(
+        crs, crs.geodetic_crs, always_xy=True
+    )
+
+
+def bboxslices(srs, x, y, bbox):
+    """
+    Find the x and y slices of a Lambert Conformal grid that cover a lon/lat
+    box. Columns are kept if any cell has a longitude in the box and rows are
+    kept if any cell has a latitude in the box. Only grid edges are projected
+    because longitude is monotonic along a column (bounded by the first and
+    last rows) and latitude along a row is bounded by the first column, the
+    last column, and the central meridian (x=0).
+
+    Arguments
+    ---------
+    srs : str
+        PROJ string of the grid (e.g., crs_proj4 attribute)
+    x : array-like
+        1-d projected x coordinates of cell centers
+    y : array-like
+        1-d projected y coordinates of cell centers
+    bbox : tuple
+        lower left lon, lower left lat, upper right lon, upper right lat
+
+    Returns
+    -------
+    xslice, yslice : slice
+        Index slices suitable for isel
+    """
+    import numpy as np
+
+    transform = getinvtransformer(srs).transform
+    x = np.asarray(x)
+    y = np.asarray(y)
+    nx = x.size
+    ny = y.size
+    ex = np.concatenate([x, x])
+    ey = np.repeat([y[0], y[-1]], nx)
+    elon, _ = transform(ex, ey)
+    elon = elon.reshape(2, nx)
+    inlon = (elon.max(0) >= bbox[0]) & (elon.min(0) <= bbox[2])
+    xc = x[np.abs(x).argmin()]
+    ex = np.repeat([x[0], xc, x[-1]], ny)
+    ey = np.tile(y, 3)
+    _, elat = transform(ex, ey)
+    elat = elat.reshape(3, ny)
+    inlat = (elat.max(0) >= bbox[1]) & (elat.min(0) <= bbox[3])
+
+    def toslice(mask):
+        idx = np.flatnonzero(mask)
+        if idx.size == 0:
+            return slice(0, 0)
+        return slice(idx[0], idx[-1] + 1)
+
+    return toslice(inlon), toslice(inlat)
 
 
 def open_mostrecent(
@@ -143,8 +383,7 @@ def open_mostrecent(
         Dataset from NCEI archive of National Guidance Data Center
     """
     import xarray as xr
-    import pandas as pd
-    edate = pd.to_datetime(bdate) + pd.to_timedelta('1h')
+    edate = pd.to_datetime(bdate) + _onehour
     if filedate is None:
         filedate = bdate
     if key.startswith('LOPZ99'):
@@ -158,17 +397,20 @@ def open_mostrecent(
     if len(paths) == 0:
         raise IOError('Could not find relevant file.')
     for path in paths[::-1]:
+        # Opening is lazy; only coordinates are read until values are used
+        srcf = xr.open_dataset(path)
         try:
-            naqfcf = xr.open_dataset(path)
-            naqfcf = naqfcf.sel(time=edate, sigma=1)
+            naqfcf = srcf.sel(time=edate, sigma=1)
             # Move "time" to midpoint, which helps prevent ambigous start/end
             naqfcf.coords['time'] = (
-                naqfcf.coords['time'] + pd.to_timedelta('-30min')
+                naqfcf.coords['time'] + _tomidhour
             )
             addcrs(naqfcf)
             naqfcf.attrs['file_url'] = path
             return naqfcf
         except KeyError as e:
+            # Release the OPeNDAP connection before trying the next file
+            srcf.close()
             last_err = e
             logger.info(f'{bdate} not in {path}; testing next available file')
     else:
@@ -181,76 +423,155 @@ def open_mostrecent(
             raise last_err
 
 
-def open_operational(
-    bdate, key='LZQZ99_KWBP', filedate=None, source='nomads', failback='24h',
-    verbose=4
+def gettmpdir(nbytes=None):
+    """
+    Choose a directory for temporary downloads. A RAM-backed /dev/shm is
+    used when it exists, is writable, and has room for twice nbytes.
+
+    Arguments
+    ---------
+    nbytes : int or None
+        Expected size of the file. If None, /dev/shm is not used.
+
+    Returns
+    -------
+    tmpdir : str or None
+        '/dev/shm' or None (i.e., the tempfile default)
+    """
+    import os
+    import shutil
+
+    shmdir = '/dev/shm'
+    if nbytes is None:
+        return None
+    if not (os.path.isdir(shmdir) and os.access(shmdir, os.W_OK)):
+        return None
+    if shutil.disk_usage(shmdir).free < 2 * nbytes:
+        return None
+    return shmdir
+
+
+def _operationalcandidates(
+    bdate, key='LZQZ99_KWBP', source='nomads', filedate=None, failback='24h'
 ):
     """
-    Finds and opens the most recent NCEP (today or yesterday) or NWS (today
-    only) forecast.
+    List operational files that could contain bdate in order of preference:
+    latest cycle first, then cycles from failback days until no cycle can
+    reach bdate.
 
     Arguments
     ---------
     bdate : datetime-like
         Beginning hour of hourly average
     key : str
-        Hourly average CONUS: LZQZ99_KWBP (pm) or LYUZ99_KWBP (ozone)
-        w/ bias correction: LOPZ99_KWBP (pm) or YBPZ99_KWBP (ozone)
-        For more key options, see:
-        https://www.nws.noaa.gov/directives/sym/pd01005016curr.pdf
-    filedate : datetime-like or None
-        Date of file to open
-    verbose : int
-        Level of verbosity.
+        NDGD key (e.g., LZQZ99_KWBP)
     source : str
-        Source either 'nws', 'ncep', or 'nomads' and only applies when
-        requesting a file from the last two days.
-        * 'nws' is the true operational site.
-        * 'ncep' provides more thorough file naming.
-        * 'nomads' is like 'ncep'
+        'nomads', 'ncep', or 'nws'
+    filedate : datetime-like or None
+        Date of first file to try; defaults to bdate's day
+    failback : str or None
+        Step back to earlier files; None tries only filedate.
 
-    Results
+    Returns
     -------
-    outf : xarray.Dataset
-        Outputs a file that looks like the NCEI archive file opened as a
-        NetCDF file. In addition, it will have a crs_proj4 attrribute that
-        describes the projection of the underlying file.
-
+    candidates : list
+        (source, url, cachepath) where cachepath is None if the url cannot
+        be cached (i.e., nws files are overwritten in place) or caching is
+        disabled (see util.get_cachepath).
     """
-    import os
-    import pandas as pd
-    import requests
-    import tempfile
-    import xarray as xr
-    import pyproj
-    import numpy as np
+    from ..util import get_cachepath
 
-    if key.startswith('LZQZ99') or key.startswith('LOPZ99'):
-        oldkey = 'pmtf'
-        varkey = 'Particulate_matter_fine_sigma_1_Hour_Average'
-        nwscode = 'apm25h01'
-        ncepcode = 'ave_1hr_pm25'
-        if key.startswith('LOPZ99'):
-            nwscode = nwscode + '_bc'
-            ncepcode = ncepcode + '_bc'
-    elif key.startswith('LYUZ99') or key.startswith('YBPZ99'):
-        oldkey = 'ozcon'
-        varkey = 'Ozone_Concentration_sigma_1_Hour_Average'
-        nwscode = 'ozone01'
-        ncepcode = 'ave_1hr_o3'
-        if key.startswith('YBPZ99'):
-            nwscode = nwscode + '_bc'
-            ncepcode = ncepcode + '_bc'
-    else:
-        raise KeyError(f'Unknown key {key}')
+    meta = getkeymeta(key)
+    nwscode = meta['nwscode']
+    ncepcode = meta['ncepcode']
+    if source not in _aqmroots and source != 'nws':
+        raise KeyError(f'source must be nws, ncep, or nomads not {source}')
 
     bdate = pd.to_datetime(bdate)
-    edate = bdate + pd.to_timedelta('1h')
+    edate = bdate + _onehour
     if filedate is None:
         filedate = bdate.floor('1d')
+    filedate = pd.to_datetime(filedate)
+
+    candidates = []
+    urls = set()
+    while True:
+        # 0 and 18Z have only 6h... should these be used at all?
+        # 0 and 18Z were discontinued https://www.weather.gov/media/
+        #     notification/pdf_2023_24/pns24-14_aqm_v7_product_removal.pdf
+        for sh in [12, 6]:
+            firsth = filedate + pd.Timedelta(hours=sh + 1)
+            lasth = filedate + pd.Timedelta(
+                hours={18: 6, 12: 72, 6: 72, 0: 6}[sh] + 1
+            )
+            if firsth > edate:
+                continue
+            if lasth < edate:
+                continue
+            if source in _aqmroots:
+                url = (
+                    f'{_aqmroots[source]}/aqm.{filedate:%Y%m%d}/{sh:02d}/'
+                    + f'aqm.t{sh:02d}z.{ncepcode}.227.grib2'
+                )
+                # ncep and nomads host identical dated files, so the decoded
+                # hour can be reused by later calls.
+                cachepath = get_cachepath(
+                    f'{filedate:%Y/%m/%d}/aqm.t{sh:02d}z.{ncepcode}.227'
+                    + f'_{edate:%Y%m%d%H}.nc'
+                )
+            else:
+                url = (
+                    'https://tgftp.nws.noaa.gov/SL.us008001/ST.opnl/DF.gr2/'
+                    + f'DC.ndgd/GT.aq/AR.conus/ds.{nwscode}.bin'
+                )
+                cachepath = None
+            if url not in urls:
+                urls.add(url)
+                candidates.append((source, url, cachepath))
+        if failback is None:
+            break
+        filedate = filedate - pd.to_timedelta(failback)
+        # no cycle from filedate or earlier reaches edate
+        if filedate + pd.Timedelta(hours=73) < edate:
+            break
+    return candidates
 
-    gridds = getgrid(key)
 
+def _openoperationalurl(url, key, bdate, nbytes=None, cachepath=None):
+    """
+    Download an operational GRIB2 file and decode the hour starting at bdate
+    to look like the NCEI archive file.
+
+    Arguments
+    ---------
+    url : str
+        Operational file url
+    key : str
+        NDGD key (e.g., LZQZ99_KWBP)
+    bdate : datetime-like
+        Beginning hour of hourly average
+    nbytes : int or None
+        Expected size (e.g., Content-Length) used to choose a tmpdir
+    cachepath : str or None
+        If provided, the decoded hour is written to cachepath.
+
+    Returns
+    -------
+    outf : xarray.Dataset
+        Decoded hour with crs_proj4 and file_url attributes
+    """
+    import os
+    import shutil
+    import tempfile
+    import xarray as xr
+    import numpy as np
+    from ..util import get_session
+
+    meta = getkeymeta(key)
+    oldkey = meta['oldkey']
+    varkey = meta['varkey']
+    edate = pd.to_datetime(bdate) + _onehour
+    gridds = getgrid(key)
     # nws_cf227_proj4 = (
     #     '+proj=lcc +lat_1=25 +lat_0=25 +lon_0=265 +k_0=1 +x_0=0 +y_0=0'
     #     + ' +R=6371229 +units=km +no_defs'
@@ -258,101 +579,214 @@ def open_operational(
     # nws_cf227_proj = pyproj.Proj(nws_cf227_proj4)
     # pattrs = nws_cf227_proj.crs.to_cf()
     pattrs = gridds['LambertConformal_Projection'].attrs
-    proj = pyproj.Proj(pyproj.CRS.from_cf(pattrs))
-    nws_cf227_proj4 = proj.srs.replace('units=m', 'units=km')
-    # 0 and 18Z have only 6h... should these be used at all?
-    # 0 and 18Z were discontinued https://www.weather.gov/media/notification/
-    #     pdf_2023_24/pns24-14_aqm_v7_product_removal.pdf
-    for sh in [12, 6]:
-        firsth = filedate + pd.to_timedelta(sh + 1, unit='h')
-        lasth = filedate + pd.to_timedelta(
-            {18: 6, 12: 72, 6: 72, 0: 6}[sh] + 1, unit='h'
+    nws_cf227_proj4 = cf2srs(pattrs).replace('units=m', 'units=km')
+
+    tf = None
+    try:
+        # Stream to disk so the GRIB file is never held in memory
+        with get_session().get(url, stream=True, timeout=(5, 120)) as r:
+            r.raise_for_status()
+            # raw bypasses requests decoding; undo any gzip transfer
+            r.raw.decode_content = True
+            tmpdir = gettmpdir(nbytes)
+            # Windows requires delete=False to open the file a second time
+            with tempfile.NamedTemporaryFile(
+                delete=False, dir=tmpdir, suffix='.grib2'
+            ) as tf:
+                shutil.copyfileobj(r.raw, tf, 1 << 20)
+
+        # The file is decoded once (and cached as NetCDF when possible),
+        # so skip writing a cfgrib .idx file that would outlive tf
+        f = xr.open_dataset(
+            tf.name, engine='cfgrib', backend_kwargs=dict(indexpath='')
         )
-        if firsth > edate:
-            continue
-        if lasth < edate:
-            continue
-        # dt = bdate - filedate - pd.to_timedelta(sh, unit='h')
-        # fh = round(dt.total_seconds() / 3600, 0)
-        if source == 'ncep':
-            url = (
-                'https://ftp.ncep.noaa.gov/data/nccf/com/aqm/prod/'
-                + f'aqm.{filedate:%Y%m%d}/{sh:02d}/'
-                + f'aqm.t{sh:02d}z.{ncepcode}.227.grib2'
-            )
-        elif source == 'nomads':
-            url = (
-                'https://nomads.ncep.noaa.gov/pub/data/nccf/com/aqm/prod/'
-                + f'aqm.{filedate:%Y%m%d}/{sh:02d}/'
-                + f'aqm.t{sh:02d}z.{ncepcode}.227.grib2'
-            )
-        elif source == 'nws':
-            url = (
-                'https://tgftp.nws.noaa.gov/SL.us008001/ST.opnl/DF.gr2/'
-                + f'DC.ndgd/GT.aq/AR.conus/ds.{nwscode}.bin'
-            )
+        f = f.drop_vars(['latitude', 'longitude'])
+        # Coordinates are taken from NCEP NCEI OpenDAP
+        # to ensure consistency. Units are in km
+        f.coords['x'] = gridds['x']
+        f.coords['y'] = gridds['y']
+        lcc = gridds['LambertConformal_Projection']
+        f['LambertConformal_Projection'] = lcc
+        renames = dict(time='reftime', step='time')
+        renames[oldkey] = varkey
+        outf = f.drop('valid_time').rename(**renames)
+        outf.coords['time_bounds'] = xr.DataArray(
+            np.append(f['time'].values, f['valid_time'].values),
+            name='time_bounds', dims=('time_bounds',)
+        )
+        # valid_time is the end of the hour
+        outf.coords['time'] = xr.DataArray(
+            f.valid_time.values, name='time', dims=('time',),
+            attrs=dict(bounds='time_bounds')
+        )
+        outf.attrs['crs_proj4'] = nws_cf227_proj4
+        outf = outf.sel(time=edate.replace(tzinfo=None)).load()
+        # Set time to mid-point in hour to prevent ambiguous start/end
+        outf.coords['time'] = (
+            outf.coords['time'] + _tomidhour
+        )
+        outf.attrs['file_url'] = url
+        if cachepath is not None:
+            # Write then rename so concurrent readers never see a partial
+            # A failed cache write must not discard a decoded hour
+            tmppath = None
+            try:
+                cachedir = os.path.dirname(cachepath)
+                os.makedirs(cachedir, exist_ok=True)
+                tmpfd, tmppath = tempfile.mkstemp(suffix='.nc', dir=cachedir)
+                os.close(tmpfd)
+                outf.to_netcdf(tmppath)
+                os.replace(tmppath, cachepath)
+            except Exception as e:
+                logger.warning(f'Unable to cache {cachepath}: {str(e)}')
+                if tmppath is not None and os.path.exists(tmppath):
+                    os.unlink(tmppath)
+        return outf
+    finally:
+        # Ensure that the temporary file unlinked
+        if tf:
+            os.unlink(tf.name)
+
+
+def _openoperationalfirst(candidates, key, bdate, verbose=0):
+    """
+    Open the first available candidate. Every candidate preceding the first
+    cached one is probed with HEAD concurrently, so that missing files cost
+    one concurrent round trip. Only the most preferred candidate that
+    responded 200 is downloaded; if it fails, the next is tried.
+
+    Arguments
+    ---------
+    candidates : list
+        (source, url, cachepath) in order of preference (see
+        _operationalcandidates)
+    key : str
+        NDGD key (e.g., LZQZ99_KWBP)
+    bdate : datetime-like
+        Beginning hour of hourly average
+    verbose : int
+        Level of verbosity.
+
+    Returns
+    -------
+    outf : xarray.Dataset
+        See open_operational
+    """
+    import os
+    import requests
+    import xarray as xr
+    from concurrent.futures import ThreadPoolExecutor
+    from ..util import get_session
+
+    session = get_session()
+    probes = []
+    for src, url, cachepath in candidates:
+        if cachepath is not None and os.path.exists(cachepath):
+            break
+        probes.append(url)
+
+    heads = {}
+    if len(probes) > 0:
+        with ThreadPoolExecutor(max_workers=min(8, len(probes))) as executor:
+            for url in probes:
+                heads[url] = executor.submit(
+                    session.head, url, allow_redirects=True, timeout=(5, 30)
+                )
+
+    for src, url, cachepath in candidates:
         if verbose > 0:
             logger.info(url)
+        if url not in heads:
+            if verbose > 0:
+                logger.info(f'Using cached {cachepath}')
+            with xr.open_dataset(cachepath) as cachef:
+                return cachef.load()
 
-        tf = None
         try:
-            if verbose > 1:
-                logger.info(f'URL: {url}')
-            r = requests.get(url)
-            if r.status_code != 200:
-                if verbose > 0:
-                    logger.info(f'Code {r.status_code} {url}')
-                continue
-
-            # Windows requires delete=False to open the file a second time
-            with tempfile.NamedTemporaryFile(delete=False) as tf:
-                tf.write(r.content)
-                f = xr.open_dataset(tf.name, engine='cfgrib')
-                f = f.drop_vars(['latitude', 'longitude'])
-                # Coordinates are taken from NCEP NCEI OpenDAP
-                # to ensure consistency. Units are in km
-                f.coords['x'] = gridds['x']
-                f.coords['y'] = gridds['y']
-                lcc = gridds['LambertConformal_Projection']
-                f['LambertConformal_Projection'] = lcc
-                renames = dict(time='reftime', step='time')
-                renames[oldkey] = varkey
-                outf = f.drop('valid_time').rename(**renames)
-                outf.coords['time_bounds'] = xr.DataArray(
-                    np.append(f['time'].values, f['valid_time'].values),
-                    name='time_bounds', dims=('time_bounds',)
-                )
-                # valid_time is the end of the hour
-                outf.coords['time'] = xr.DataArray(
-                    f.valid_time.values, name='time', dims=('time',),
-                    attrs=dict(bounds='time_bounds')
-                )
-                outf.attrs['crs_proj4'] = nws_cf227_proj4
-                outf = outf.sel(time=edate.replace(tzinfo=None)).load()
-                # Set time to mid-point in hour to prevent ambiguous start/end
-                outf.coords['time'] = (
-                    outf.coords['time'] + pd.to_timedelta('-30min')
-                )
-                outf.attrs['file_url'] = url
-                return outf
-        except requests.models.HTTPError:
+            head = heads[url].result()
+        except requests.exceptions.RequestException as e:
+            logger.info(f'{src} failed: {str(e)}')
             continue
+        if head.status_code != 200:
+            if verbose > 0:
+                logger.info(f'Code {head.status_code} {url}')
+            continue
+        nbytes = head.headers.get('Content-Length')
+        nbytes = None if nbytes is None else int(nbytes)
+        try:
+            outf = _openoperationalurl(
+                url, key, bdate, nbytes=nbytes, cachepath=cachepath
+            )
         except KeyError:
             # When 00 or 18Z are run, they only have 6 hours of data, which may
             # not include the file
             continue
         except Exception as e:
-            raise e
-        finally:
-            # Ensure that the temporary file unlinked
-            if tf:
-                os.unlink(tf.name)
-    else:
-        filedate = filedate - pd.to_timedelta(failback)
-        return open_operational(
-            bdate, filedate=filedate, verbose=verbose, source=source, key=key,
-            failback=failback
-        )
+            # e.g., a failed download or undecodable file; try the next
+            logger.info(f'{src} failed: {str(e)}')
+            continue
+        if verbose > 0:
+            logger.info(f'{src} succeeded')
+        return outf
+
+    srcs = ', '.join(dict.fromkeys(src for src, url, cp in candidates))
+    raise IOError(f'{srcs} failed to provide {key} for {bdate}.')
+
+
+def open_operational(
+    bdate, key='LZQZ99_KWBP', filedate=None, source='nomads', failback='24h',
+    verbose=4
+):
+    """
+    Finds and opens the most recent NCEP (today or yesterday) or NWS (today
+    only) forecast.
+
+    The decoded hour from ncep or nomads is cached as
+    %Y/%m/%d/aqm.tHHz.{ncepcode}.227_%Y%m%d%H.nc relative to the working
+    directory and reused by later calls. Set the AIRFUSE_CACHEDIR
+    environment variable to another directory to relocate the cache or to
+    'none' to disable it (see util.get_cachepath).
+
+    Arguments
+    ---------
+    bdate : datetime-like
+        Beginning hour of hourly average
+    key : str
+        Hourly average CONUS: LZQZ99_KWBP (pm) or LYUZ99_KWBP (ozone)
+        w/ bias correction: LOPZ99_KWBP (pm) or YBPZ99_KWBP (ozone)
+        For more key options, see:
+        https://www.nws.noaa.gov/directives/sym/pd01005016curr.pdf
+    filedate : datetime-like or None
+        Date of file to open
+    verbose : int
+        Level of verbosity.
+    source : str or list
+        Source either 'nws', 'ncep', or 'nomads' and only applies when
+        requesting a file from the last two days. A list of sources is
+        tried in order of preference.
+        * 'nws' is the true operational site.
+        * 'ncep' provides more thorough file naming.
+        * 'nomads' is like 'ncep'
+    failback : str or None
+        If file could not be found, find the previous XXh file.
+
+    Results
+    -------
+    outf : xarray.Dataset
+        Outputs a file that looks like the NCEI archive file opened as a
+        NetCDF file. In addition, it will have a crs_proj4 attrribute that
+        describes the projection of the underlying file.
+
+    """
+    srcs = [source] if isinstance(source, str) else list(source)
+    candidates = []
+    for src in srcs:
+        candidates.extend(_operationalcandidates(
+            bdate, key=key, source=src, filedate=filedate, failback=failback
+        ))
+    # Retrieve the grid before any download needs it.
+    getgrid(key)
+    return _openoperationalfirst(candidates, key, bdate, verbose=verbose)
 
 
 def get_mostrecent(
@@ -378,7 +812,8 @@ def get_mostrecent(
     filedate : datetime-like
         Date of the file
     path : str
-        Path to archive result for reuse (not currently operational)
+        Path to archive result for reuse. Paths ending in .zarr are stored
+        as Zarr (requires zarr); otherwise, as compressed NetCDF.
     verbose : int
         Level of verbosity
 
@@ -397,34 +832,32 @@ def get_mostrecent(
     """
     import os
     import xarray as xr
-    import pandas as pd
-    import pyproj
 
+    varkey = getkeymeta(key)['varkey']
     naqfcf = None
     if path is not None:
         if os.path.exists(path):
-            naqfcf = xr.open_dataset(path)
+            if path.endswith('.zarr'):
+                naqfcf = xr.open_zarr(path)
+            else:
+                naqfcf = xr.open_dataset(path)
 
     if naqfcf is None:
         bdate = pd.to_datetime(bdate, utc=True)
-        dt = (pd.to_datetime('now', utc=True).floor('1d') - bdate.floor('1d'))
+        dt = (pd.Timestamp.now(tz='UTC').floor('1d') - bdate.floor('1d'))
         ds = dt.total_seconds()
         # Start date must be today (-0day) or yesterday (-1day)
         # if the result is older than -1day, use NCEI
         if ds < (1.5 * 24 * 3600):
             if verbose > 0:
                 logger.info(f'Calling open_operational {key}')
-            opts = dict(key=key, failback=failback, verbose=verbose)
             # Cascaded fail system: first nomads, then ncep, then nws.
-            # If any succeeds, the rest are not tried.
-            for src in ['nomads', 'ncep', 'nws']:
-                try:
-                    naqfcf = open_operational(bdate, source=src, **opts)
-                    break
-                except Exception as e:
-                    logger.info(f'{src} failed: {str(e)}')
-            else:
-                raise IOError('nomads, ncep, and nws all failed.')
+            # Files from every source are probed at once, but only the most
+            # preferred available file is downloaded.
+            naqfcf = open_operational(
+                bdate, key=key, source=['nomads', 'ncep', 'nws'],
+                failback=failback, verbose=verbose
+            )
         else:
             if verbose > 0:
                 logger.info(f'Calling open_mostrecent {key}')
@@ -432,32 +865,32 @@ def get_mostrecent(
                 bdate.replace(tzinfo=None), key=key, failback=failback
             )
         if path is not None:
-            naqfcf.to_netcdf(path)
-
-    if key.startswith('LZQZ99') or key.startswith('LOPZ99'):
-        varkey = 'Particulate_matter_fine_sigma_1_Hour_Average'
-    elif key.startswith('LYUZ99') or key.startswith('YBPZ99'):
-        varkey = 'Ozone_Concentration_sigma_1_Hour_Average'
-    else:
-        raise KeyError(f'{key} unknown try LZQZ99_KWBP or LYUZ99_KWBP.')
+            # Load once so that writing and subsetting share one retrieval
+            naqfcf = naqfcf.load()
+            if path.endswith('.zarr'):
+                # zarr applies its default (blosc/zstd) compressor
+                naqfcf.to_zarr(path, mode='w')
+            else:
+                encoding = {
+                    k: dict(zlib=True, complevel=1)
+                    for k, v in naqfcf.data_vars.items() if v.ndim > 0
+                }
+                naqfcf.to_netcdf(path, encoding=encoding)
 
-    var = naqfcf[varkey].load()
+    var = naqfcf[varkey]
     if bbox is not None:
-        # Find lon/lat coordinates of projected cell centroids
-        proj = pyproj.Proj(naqfcf.attrs['crs_proj4'])
-        Y, X = xr.broadcast(var.y, var.x)
-        LON, LAT = proj(X.values, Y.values, inverse=True)
-        LON = X * 0 + LON
-        LAT = Y * 0 + LAT
         # Find projected box covering lon/lat box
-        inlon = ((LON >= bbox[0]) & (LON <= bbox[2])).any('y')
-        inlat = ((LAT >= bbox[1]) & (LAT <= bbox[3])).any('x')
-        var = var.sel(x=inlon, y=inlat)
+        srs = naqfcf.attrs['crs_proj4']
+        xslice, yslice = bboxslices(srs, var.x, var.y, bbox)
+        var = var.isel(x=xslice, y=yslice)
+
+    # Load after subsetting so that OPeNDAP only transfers the bbox
+    var = var.load()
 
     var.attrs['crs_proj4'] = naqfcf.attrs['crs_proj4']
     var.attrs['long_name'] = varkey
     var.name = 'NAQFC'
-    nowstr = pd.to_datetime('now', utc=True).strftime('%Y-%m-%dT%H:%M:%S')
+    nowstr = pd.Timestamp.now(tz='UTC').strftime('%Y-%m-%dT%H:%M:%S')
     fileurl = naqfcf.attrs['file_url']
     var.attrs['description'] = f'{fileurl} (retrieved: {nowstr}Z)'
     return var
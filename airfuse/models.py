@@ -1,22 +1,263 @@
-__all__ = ['applyfusion', 'get_fusions']
+__all__ = ['applyfusion', 'applyfusions', 'get_fusions']
 
+# Same folds as nna_methods.NNA.cross_validate
+_cvkwds = dict(n_splits=10, shuffle=True, random_state=1)
 
-def get_fusions(n=30):
+
+def get_fusions(n=30, idw_maxdist=None):
     """
     Get instances of default models
+
+    Arguments
+    ---------
+    n : int
+        Maximum number of neighbors
+    idw_maxdist : float or None
+        If provided, IDW neighbors farther than idw_maxdist (in projected
+        units; km on the NAQFC grid) are masked from the weights. With
+        power=-5, a neighbor 3 times farther than the nearest contributes
+        less than 1% of the weight, so a cutoff of a few typical monitor
+        spacings has little effect where neighbors are within the cutoff.
+        Points with no neighbor within the cutoff are predicted as NaN by
+        applyfusion. None (default) uses no cutoff.
+
+    Returns
+    -------
+    models : dict
+        IDW and VNA nna_methods.NNA instances
     """
     import nna_methods
+
+    idwkw = {}
+    if idw_maxdist is not None:
+        idwkw['maxdist'] = idw_maxdist
     models = dict(
-        IDW=nna_methods.NNA(method='nearest', k=min(10, n), power=-5),
+        IDW=nna_methods.NNA(
+            method='nearest', k=min(10, n), power=-5, **idwkw
+        ),
         VNA=nna_methods.NNA(method='voronoi', k=min(30, n), power=-2),
     )
     return models
 
 
+def _predict(mod, X, nndist=None, **kwds):
+    """
+    mod.predict(X) as a float array with NaN where no neighbor is within
+    mod.maxdist. NNA masks the weights of those neighbors, but a fully
+    masked row of a 2-d prediction is returned as 0.
+
+    Arguments
+    ---------
+    mod : nna_methods.NNA
+        Fit model
+    X : array-like
+        n by 2 array of coordinates
+    nndist : array-like or None
+        Distance from each row of X to its nearest neighbor (after leaving
+        out self with loo). If None and mod.maxdist is set, it is found
+        with mod.nn. Callers that also report the distance pass it here so
+        the neighbor search is done once.
+    kwds : mappable
+        Passed to mod.predict (e.g., loo=True)
+
+    Returns
+    -------
+    yhat : np.ndarray
+        Predictions with NaN where no neighbor is within mod.maxdist
+    """
+    import numpy as np
+
+    yhat = np.ma.filled(
+        np.ma.asarray(mod.predict(X, **kwds), dtype='d'), np.nan
+    )
+    maxdist = getattr(mod, 'maxdist', None)
+    if maxdist is not None and np.isfinite(maxdist) and X.shape[0] > 0:
+        # The nearest neighbor (after leaving out self) is always a Voronoi
+        # neighbor, so a row is fully masked only if it is beyond maxdist.
+        loo = kwds.get('loo')
+        if loo is None:
+            loo = getattr(mod, 'loo', False)
+        if nndist is None:
+            k = 2 if loo else 1
+            nndist = mod.nn(X, k=k)[0][:, k - 1]
+        yhat[np.asarray(nndist) > maxdist] = np.nan
+    return yhat
+
+
+def _cvfold(mod, X, Y, train_index, test_index):
+    """
+    Fit a copy of mod on the training rows and predict the held out rows.
+
+    Arguments
+    ---------
+    mod : nna_methods.NNA
+        Model to copy and fit
+    X : array-like
+        n by 2 array of coordinates
+    Y : array-like
+        n by m array of values
+    train_index, test_index : array-like
+        Indices of training and testing rows
+
+    Returns
+    -------
+    test_index, yhat, dist : tuple
+        yhat is the prediction at test_index and dist is the distance to the
+        nearest training row.
+    """
+    import copy
+
+    fmod = copy.deepcopy(mod)
+    fmod.fit(X[train_index], Y[train_index])
+    dist = fmod.nn(X[test_index], k=1)[0][:, 0]
+    yhat = _predict(fmod, X[test_index], nndist=dist)
+    return test_index, yhat, dist
+
+
+def _cross_validate(mod, X, Y, njobs=None):
+    """
+    KFold cross validation of all columns of Y with one fit per fold. The
+    folds match nna_methods.NNA.cross_validate.
+
+    Arguments
+    ---------
+    mod : nna_methods.NNA
+        Model to fit for each fold
+    X : array-like
+        n by 2 array of coordinates
+    Y : array-like
+        n by m array of values
+    njobs : int or None
+        If None, fit folds serially; otherwise, use joblib threads.
+
+    Returns
+    -------
+    yhat, dist, fold : tuple
+        n by m predictions, n distances to nearest training row, and n fold
+        numbers.
+    """
+    from sklearn.model_selection import KFold
+    import numpy as np
+
+    X = np.asarray(X)
+    Y = np.asarray(Y)
+    splits = KFold(**_cvkwds).split(X)
+    if njobs is None:
+        results = [
+            _cvfold(mod, X, Y, train_index, test_index)
+            for train_index, test_index in splits
+        ]
+    else:
+        from joblib import Parallel, delayed
+        with Parallel(n_jobs=njobs, prefer='threads') as par:
+            results = par(
+                delayed(_cvfold)(mod, X, Y, train_index, test_index)
+                for train_index, test_index in splits
+            )
+
+    yhat = np.full(Y.shape, np.nan)
+    dist = np.full(X.shape[0], np.nan)
+    fold = np.full(X.shape[0], np.nan)
+    for i, (test_index, fyhat, fdist) in enumerate(results):
+        yhat[test_index] = fyhat
+        dist[test_index] = fdist
+        fold[test_index] = i
+
+    return yhat, dist, fold
+
+
+def _unstack(stacked, sizes):
+    """
+    Split rows of stacked into consecutive blocks.
+
+    Arguments
+    ---------
+    stacked : array-like
+        Array with sum(sizes.values()) rows
+    sizes : mappable
+        name: number of rows in that block
+
+    Returns
+    -------
+    blocks : dict
+        name: rows of stacked for that block
+    """
+    blocks = {}
+    start = 0
+    for key, n in sizes.items():
+        blocks[key] = stacked[start:start + n]
+        start += n
+
+    return blocks
+
+
+def _batch_predict(mod, queries, nndists=None, **kwds):
+    """
+    Answer several predictions with one call to mod.predict.
+
+    Arguments
+    ---------
+    mod : nna_methods.NNA
+        Fit model
+    queries : mappable
+        name: X where X is n by 2 coordinates
+    nndists : mappable or None
+        name: nearest neighbor distances for X (see _predict nndist)
+    kwds : mappable
+        Passed to mod.predict (e.g., loo=True)
+
+    Returns
+    -------
+    yhats : dict
+        name: predictions for X
+    """
+    import numpy as np
+
+    if len(queries) == 0:
+        return {}
+    stacked = np.concatenate(list(queries.values()), axis=0)
+    nndist = None
+    if nndists is not None:
+        nndist = np.concatenate([nndists[key] for key in queries], axis=0)
+    yhat = _predict(mod, stacked, nndist=nndist, **kwds)
+    sizes = {key: X.shape[0] for key, X in queries.items()}
+    return _unstack(yhat, sizes)
+
+
+def _batch_nn(mod, queries):
+    """
+    Answer several nearest neighbor queries with one call to mod.nn.
+
+    Arguments
+    ---------
+    mod : nna_methods.NNA
+        Fit model
+    queries : mappable
+        name: (X, k) where X is n by 2 coordinates and k is the number of
+        neighbors needed for that query
+
+    Returns
+    -------
+    dists : dict
+        name: n by k distances to the nearest neighbors
+    """
+    import numpy as np
+
+    if len(queries) == 0:
+        return {}
+    maxk = max(k for X, k in queries.values())
+    stacked = np.concatenate([X for X, k in queries.values()], axis=0)
+    dist = mod.nn(stacked, k=maxk)[0]
+    sizes = {key: X.shape[0] for key, (X, k) in queries.items()}
+    dists = _unstack(dist, sizes)
+    return {key: dists[key][:, :k] for key, (X, k) in queries.items()}
+
+
 def applyfusion(
     mod, prefix, fitdf, tgtdf=None, loodf=None, xkey='x',
     ykey='y', obskey='obs_value', modkey='NAQFC', biaskey='BIAS',
-    ratiokey='RATIO', loo=True, cv=True, verbose=0, random_state=None
+    ratiokey='RATIO', loo=True, cv=True, verbose=0, random_state=None,
+    njobs=None
 ):
     """
     This is a convenience function. This assumes you are interpolating the
@@ -41,87 +282,202 @@ def applyfusion(
     fitdf, loodf, and tgtdf must contain xkey and ykey
     In addition, loodf and fitdf must contain obskey and modkey
     if biaskey or ratiokey are not in loodf and/fitdf, they will be added.
+
+    Cross validation folds are fit once for all ykeys. With njobs, folds are
+    fit concurrently using joblib threads.
     """
     import logging
+    import numpy as np
+    from .util import bias_ratio
 
     ykeys = [obskey, modkey, biaskey, ratiokey]
     xkeys = [xkey, ykey]
     # Add bias and ratio keys if they do not exist.
-    if biaskey not in fitdf.columns:
-        fitdf[biaskey] = fitdf[modkey] - fitdf[obskey]
-        if verbose > 1:
-            logging.info(f'Added fitdf {biaskey} = {modkey} - {obskey}')
-    if ratiokey not in fitdf.columns:
-        fitdf[ratiokey] = fitdf[modkey] / fitdf[obskey]
-        if verbose > 1:
-            logging.info(f'Added fitdf {ratiokey} = {modkey} / {obskey}')
-    if loodf is not None:
-        if biaskey not in loodf.columns:
-            loodf[biaskey] = loodf[modkey] - loodf[obskey]
+    for dfkey, df in [('fitdf', fitdf), ('loodf', loodf)]:
+        if df is None:
+            continue
+        addbias = biaskey not in df.columns
+        addratio = ratiokey not in df.columns
+        if not (addbias or addratio):
+            continue
+        bias, ratio = bias_ratio(df[modkey], df[obskey])
+        if addbias:
+            df[biaskey] = bias
             if verbose > 1:
-                logging.info(f'Added loodf {biaskey} = {modkey} - {obskey}')
-        if ratiokey not in loodf.columns:
-            loodf[ratiokey] = loodf[modkey] / loodf[obskey]
+                logging.info(f'Added {dfkey} {biaskey} = {modkey} - {obskey}')
+        if addratio:
+            df[ratiokey] = ratio
             if verbose > 1:
-                logging.info(f'Added loodf {ratiokey} = {modkey} / {obskey}')
+                logging.info(f'Added {dfkey} {ratiokey} = {modkey} / {obskey}')
+
+    # Extract coordinates and values once for every fit, predict, and nn.
+    # DataFrame.to_numpy is column-major, but sklearn's neighbor trees copy
+    # anything that is not C-contiguous float64.
+    fitX = np.ascontiguousarray(fitdf[xkeys].to_numpy(), dtype='d')
+    fitY = np.ascontiguousarray(fitdf[ykeys].to_numpy(), dtype='d')
 
     # Perform a CV validation
     if cv:
-        for ykey in ykeys:
-            if verbose > 0:
-                logging.info(f'Starting cross validation: {ykey}')
-            mod.cross_validate(
-                fitdf[xkeys], fitdf[ykey], df=fitdf, ykey=f'{prefix}_{ykey}'
-            )
+        if verbose > 0:
+            logging.info(f'Starting cross validation: {ykeys}')
+        cvz, cvdist, fold = _cross_validate(
+            mod, fitX, fitY, njobs=njobs
+        )
+        for ykey, y in zip(ykeys, cvz.T):
+            fitdf[f'CV_{prefix}_{ykey}'] = y
+            fitdf[f'CV_{prefix}_{ykey}_fold'] = fold
+        fitdf.attrs.update(_cvkwds)
         avna = fitdf[modkey] - fitdf[f'CV_{prefix}_{biaskey}']
         fitdf[f'CV_a{prefix}'] = avna
         evna = fitdf[modkey] / fitdf[f'CV_{prefix}_{ratiokey}']
         fitdf[f'CV_e{prefix}'] = evna
         # Add the distance to nearest during cross validation
-        for k, testdf in fitdf.groupby(f'CV_{prefix}_{ykey}_fold'):
-            traindf = fitdf.query(f'CV_{prefix}_{ykey}_fold != {k}')
-            mod.fit(traindf[xkeys], traindf[obskey])
-            fitdf.loc[testdf.index, 'CV_DIST'] = mod.nn(
-                testdf[xkeys].values, k=1
-            )[0][:, 0]
+        fitdf['CV_DIST'] = cvdist
 
     # Fit the model
-    mod.fit(fitdf[xkeys].values, fitdf[ykeys].values)
+    mod.fit(fitX, fitY)
+    # LOO predictions and distances for fitdf and loodf share one search
+    looqueries = {}
+    if loo:
+        looqueries['fit'] = fitX
+    if loodf is not None and fitdf.shape[0] > 1:
+        looqueries['loo'] = np.ascontiguousarray(
+            loodf[xkeys].to_numpy(), dtype='d'
+        )
+    if verbose > 0 and len(looqueries) > 0:
+        logging.info(f'Starting LOO: {", ".join(looqueries)}')
+    loodists = _batch_nn(
+        mod, {key: (X, 2) for key, X in looqueries.items()}
+    )
+    looz = _batch_predict(
+        mod, looqueries, loo=True,
+        nndists={key: d[:, 1] for key, d in loodists.items()}
+    )
     # Perform a leave one out validation.
     if loo:
-        if verbose > 0:
-            logging.info('Starting LOO')
-        looz = mod.predict(fitdf[xkeys].values, loo=True)
-        for ykey, y in zip(ykeys, looz.T):
+        for ykey, y in zip(ykeys, looz['fit'].T):
             fitdf[f'LOO_{prefix}_{ykey}'] = y
         avna = fitdf[modkey] - fitdf[f'LOO_{prefix}_{biaskey}']
         fitdf[f'LOO_a{prefix}'] = avna
         evna = fitdf[modkey] / fitdf[f'LOO_{prefix}_{ratiokey}']
         fitdf[f'LOO_e{prefix}'] = evna
-        fitdf[f'LOO_{prefix}_DIST'] = mod.nn(
-            fitdf[xkeys].values, k=2
-        )[0].max(1)
+        fitdf[f'LOO_{prefix}_DIST'] = loodists['fit'].max(1)
     if loodf is not None and fitdf.shape[0] > 1:
-        if verbose > 0:
-            logging.info('Starting secondary LOO')
-        looz = mod.predict(loodf[xkeys].values, loo=True)
-        for ykey, y in zip(ykeys, looz.T):
+        # secondary LOO
+        for ykey, y in zip(ykeys, looz['loo'].T):
             loodf[f'LOO_{prefix}_{ykey}'] = y
         avna = loodf[modkey] - loodf[f'LOO_{prefix}_{biaskey}']
         loodf[f'LOO_a{prefix}'] = avna
         evna = loodf[modkey] / loodf[f'LOO_{prefix}_{ratiokey}']
         loodf[f'LOO_e{prefix}'] = evna
-        loodf[f'LOO_{prefix}_DIST'] = mod.nn(
-            loodf[xkeys].values, k=2
-        )[0].max(1)
+        loodf[f'LOO_{prefix}_DIST'] = loodists['loo'].max(1)
 
     if tgtdf is not None:
-        tgtx = tgtdf[xkeys].values
+        tgtx = np.ascontiguousarray(tgtdf[xkeys].to_numpy(), dtype='d')
         if verbose > 0:
             logging.info('Starting target prediction')
-        tgtz = mod.predict(tgtx)
+        tgtdist = mod.nn(tgtx, k=1)[0][:, 0]
+        tgtz = _predict(mod, tgtx, nndist=tgtdist)
         for ykey, y in zip(ykeys, tgtz.T):
             tgtdf[f'{prefix}_{ykey}'] = y
         tgtdf[f'a{prefix}'] = tgtdf[modkey] - tgtdf[f'{prefix}_{biaskey}']
         tgtdf[f'e{prefix}'] = tgtdf[modkey] / tgtdf[f'{prefix}_{ratiokey}']
-        tgtdf[f'{prefix}_DIST'] = mod.nn(tgtx, k=1)[0]
+        tgtdf[f'{prefix}_DIST'] = tgtdist
+
+
+def _fusioncolumns(df, keys):
+    """Copy of the keys in df, or None if df is None"""
+    if df is None:
+        return None
+    return df[[k for k in keys if k in df.columns]].copy()
+
+
+def _timedfusion(mod, prefix, fitdf, **kwds):
+    """applyfusion with begin and finish log entries"""
+    import logging
+    import time
+
+    logging.info(f'{prefix} begin')
+    t0 = time.time()
+    applyfusion(mod, prefix, fitdf, **kwds)
+    t1 = time.time()
+    logging.info(f'{prefix} finish: {t1 - t0:.0f}s')
+
+
+def applyfusions(
+    mods, fitdf, tgtdf=None, loodf=None, suffix='', njobs=None, **kwds
+):
+    """
+    Apply applyfusion for each model in mods with prefix f'{mkey}{suffix}'.
+
+    Models are independent, so with njobs they are applied concurrently
+    using joblib threads. Each thread works on copies of only the columns
+    that applyfusion reads. New columns are then added to fitdf, tgtdf,
+    and loodf in model order, so the result is the same as applying the
+    models serially.
+
+    Arguments
+    ---------
+    mods : dict
+        Models (e.g., from get_fusions) keyed by name
+    fitdf, tgtdf, loodf : pandas.DataFrame
+        See applyfusion
+    suffix : str
+        Appended to each model key to make the applyfusion prefix
+    njobs : int or None
+        If None, apply models serially; otherwise, use joblib threads.
+    kwds : mappable
+        Passed to applyfusion (e.g., obskey, modkey, verbose). Folds within
+        a model are fit serially when models are applied concurrently.
+
+    Returns
+    -------
+    None
+    """
+    prefixes = {mkey: f'{mkey}{suffix}' for mkey in mods}
+    if njobs is None:
+        for mkey, mod in mods.items():
+            _timedfusion(
+                mod, prefixes[mkey], fitdf, tgtdf=tgtdf, loodf=loodf, **kwds
+            )
+        return
+
+    from joblib import Parallel, delayed
+
+    kwds = dict(kwds, njobs=None)
+    xykeys = [kwds.get('xkey', 'x'), kwds.get('ykey', 'y')]
+    modkey = kwds.get('modkey', 'NAQFC')
+    obskeys = xykeys + [
+        kwds.get('obskey', 'obs_value'), modkey,
+        kwds.get('biaskey', 'BIAS'), kwds.get('ratiokey', 'RATIO')
+    ]
+    orig = {'fitdf': fitdf, 'tgtdf': tgtdf, 'loodf': loodf}
+    incols = {
+        'fitdf': obskeys, 'tgtdf': xykeys + [modkey], 'loodf': obskeys
+    }
+    thins = {
+        mkey: {
+            dfkey: _fusioncolumns(df, incols[dfkey])
+            for dfkey, df in orig.items()
+        }
+        for mkey in mods
+    }
+    with Parallel(n_jobs=njobs, prefer='threads') as par:
+        par(
+            delayed(_timedfusion)(
+                mod, prefixes[mkey], thins[mkey]['fitdf'],
+                tgtdf=thins[mkey]['tgtdf'], loodf=thins[mkey]['loodf'],
+                **kwds
+            )
+            for mkey, mod in mods.items()
+        )
+
+    for mkey in mods:
+        for dfkey, df in orig.items():
+            if df is None:
+                continue
+            thin = thins[mkey][dfkey]
+            for key in thin.columns:
+                if key not in incols[dfkey] or key not in df.columns:
+                    df[key] = thin[key].to_numpy()
+            df.attrs.update(thin.attrs)
@@ -1,6 +1,71 @@
-__all__ = ['pair_airnow', 'pair_aqs', 'pair_purpleair', 'pair_goes']
+__all__ = [
+    'pair', 'pair_batch', 'pair_airnow', 'pair_aqs', 'pair_purpleair',
+    'pair_goes'
+]
 
 
 from .epa import pair_airnow, pair_aqs
 from .purpleair import pair_purpleair
 from .goes import pair_goes
+
+_pairfuncs = {
+    'airnow': pair_airnow, 'aqs': pair_aqs, 'purpleair': pair_purpleair,
+    'goes': pair_goes
+}
+
+
+def pair(bdate, bbox, proj, var, spc, src, **kwds):
+    """
+    Arguments
+    ---------
+    bdate : datelike
+        Beginning date for observations. edate = bdate + 3599 seconds
+    bbox : tuple
+        lower left lon, lower left lat, upper right lon, upper right lat
+    proj : pyproj.Proj
+        Projection of the model variable (var)
+    var : xr.DataArray
+        Model variable with values on centers
+    spc : str
+        Name of the species to retrieve
+    src : str
+        Observation source: airnow, aqs, purpleair, or goes
+    kwds : mappable
+        Passed to pair_{src} (e.g., api_key for purpleair)
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        Result of pair_{src}
+    """
+    if src not in _pairfuncs:
+        raise KeyError(f'{src} unknown; use {", ".join(_pairfuncs)}')
+    return _pairfuncs[src](bdate, bbox, proj, var, spc, **kwds)
+
+
+def pair_batch(tasks, max_workers=8):
+    """
+    Run independent pair calls concurrently. Pairing is dominated by
+    downloads, so threads overlap the network waits.
+
+    Arguments
+    ---------
+    tasks : iterable
+        Each task is (bdate, bbox, proj, var, spc, src, kwds) as in pair
+    max_workers : int
+        Maximum number of concurrent pair calls
+
+    Returns
+    -------
+    dfs : list
+        Results of pair for each task in the same order as tasks. If any
+        task fails, its exception is raised.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    def _pair(task):
+        bdate, bbox, proj, var, spc, src, kwds = task
+        return pair(bdate, bbox, proj, var, spc, src, **kwds)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_pair, tasks))
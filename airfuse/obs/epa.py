@@ -5,10 +5,183 @@ __all__ = [
     'pair_airnowaqobsfile', 'pair_airnowhourlydatafile'
 ]
 
+import functools
 import logging
 logger = logging.getLogger(__name__)
 
 
+def _read_csv(url, filedate=None, **kwds):
+    """
+    pd.read_csv for a url fetched with the shared util.get_session, so
+    repeated AirNow file reads reuse pooled connections. The file is kept
+    at the url path without https:// (e.g., files.airnowtech.org/...)
+    relative to the working directory or AIRFUSE_CACHEDIR (see
+    util.get_cachepath; AIRFUSE_CACHEDIR=none disables the copy). AirNow
+    files are revised for up to 72h, so a local copy written more than 72h
+    after filedate is read without a request. Otherwise, later reads send a
+    conditional GET (If-Modified-Since) and, on 304, the local copy is read
+    without downloading the file again. If the copy cannot be written, the
+    downloaded content is parsed in memory.
+
+    Arguments
+    ---------
+    url : str
+        Remote file
+    filedate : datetime-like or None
+        Hour (UTC) the file describes; if None, the server is always asked
+    kwds : mappable
+        Passed to pd.read_csv
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        Parsed file
+    """
+    import io
+    import os
+    import tempfile
+    import email.utils
+    import pandas as pd
+    from ..util import get_session, get_cachepath
+
+    local_path = get_cachepath(url.split('://', 1)[-1])
+    if local_path is None:
+        r = get_session().get(url, timeout=(5, 120))
+        r.raise_for_status()
+        return pd.read_csv(io.BytesIO(r.content), **kwds)
+
+    headers = {}
+    if os.path.exists(local_path):
+        mtime = os.path.getmtime(local_path)
+        if filedate is not None:
+            fdate = pd.to_datetime(filedate)
+            if fdate.tzinfo is None:
+                fdate = fdate.tz_localize('UTC')
+            final = (fdate + pd.to_timedelta('72h')).timestamp()
+            if mtime > final:
+                logger.info(f'Using final {local_path}')
+                return pd.read_csv(local_path, **kwds)
+        headers['If-Modified-Since'] = email.utils.formatdate(
+            mtime, usegmt=True
+        )
+
+    r = get_session().get(url, headers=headers, timeout=(5, 120))
+    if r.status_code == 304:
+        logger.info(f'Using cached {local_path}')
+        return pd.read_csv(local_path, **kwds)
+
+    r.raise_for_status()
+    tmp_path = None
+    try:
+        localdir = os.path.dirname(local_path)
+        os.makedirs(localdir, exist_ok=True)
+        tmpfd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=localdir)
+        with os.fdopen(tmpfd, 'wb') as f:
+            f.write(r.content)
+        # Use the server time so If-Modified-Since compares server clocks
+        lastmod = r.headers.get('Last-Modified')
+        if lastmod is not None:
+            mtime = email.utils.parsedate_to_datetime(lastmod).timestamp()
+            os.utime(tmp_path, (mtime, mtime))
+        os.replace(tmp_path, local_path)
+        tmp_path = None
+    except Exception as e:
+        logger.warning(f'Unable to cache {local_path}: {str(e)}')
+        return pd.read_csv(io.BytesIO(r.content), **kwds)
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    return pd.read_csv(local_path, **kwds)
+
+
+def _loadjson(r):
+    """
+    Parse a JSON response body with orjson when available.
+
+    Arguments
+    ---------
+    r : requests.Response
+        Response with a JSON body
+
+    Returns
+    -------
+    out : list or dict
+        Parsed JSON
+    """
+    try:
+        import orjson
+    except ImportError:
+        # orjson is optional; r.json gives the same result more slowly
+        return r.json()
+    return orjson.loads(r.content)
+
+
+def _nanmissing(df, missing=-999.):
+    """
+    Same as df.replace(missing, np.nan), but only numeric columns are
+    compared. API responses include several text columns that can never
+    hold the numeric missing value.
+
+    Arguments
+    ---------
+    df : pandas.DataFrame
+        Frame to update in place
+    missing : float
+        Missing value flag
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        Same frame with missing set to NaN
+    """
+    numkeys = df.select_dtypes('number').columns
+    df[numkeys] = df[numkeys].where(df[numkeys] != missing)
+    return df
+
+
+@functools.lru_cache(maxsize=8)
+def _airnowsitemeta(date, spckey):
+    """
+    AirNow monitoring site locations for spckey on date. The file changes
+    at most daily, so it is cached across the hourly pairing calls.
+
+    Arguments
+    ---------
+    date : str
+        Date as YYYYMMDD
+    spckey : str
+        AirNow parameter_name (e.g., PM2.5)
+
+    Returns
+    -------
+    sitemetadf : pandas.DataFrame
+        One row per AQSID with AQSID, agency_name, Latitude, and Longitude.
+        Shared between calls, so it must not be modified in place.
+    """
+    import numpy as np
+
+    airnowroot = 'https://files.airnowtech.org/airnow'
+    airnowsitecols = (
+        'AQSID|parameter_name|site_code|site_name|status|agency_id'
+        + '|agency_name|EPA_region|Latitude|Longitude|elevation|GMT_offset'
+        + '|country_code|d1|d2|MSA_code|MSA_name|state_code|state_name'
+        + '|county_code|county_name|d3|d4'
+    ).split('|')
+    # Only the columns used in the merge are parsed from the site file
+    sitekeys = [
+        'AQSID', 'parameter_name', 'agency_name', 'Latitude', 'Longitude'
+    ]
+    sitemetadf = _read_csv(
+        f'{airnowroot}/{date[:4]}/{date}/monitoring_site_locations.dat',
+        filedate=date, encoding='latin1', delimiter='|', names=airnowsitecols,
+        usecols=sitekeys, dtype={'AQSID': str, 'parameter_name': 'category'}
+    )
+    keep = (sitemetadf['parameter_name'] == spckey).to_numpy()
+    sitemetadf = sitemetadf.take(np.flatnonzero(keep))
+    sitemetadf = sitemetadf.groupby('AQSID').first().reset_index()
+    return sitemetadf.loc[:, ['AQSID', 'agency_name', 'Latitude', 'Longitude']]
+
+
 def pair_airnow(bdate, bbox, proj, var, spc, verbose=1):
     """
     Currently uses pair_airnowapi if within 2 days and pair_airnowaqobsfile
@@ -41,7 +214,7 @@ def pair_airnow(bdate, bbox, proj, var, spc, verbose=1):
     import pandas as pd
 
     bdate = pd.to_datetime(bdate)
-    dt = bdate - pd.to_datetime('now', utc=True)
+    dt = bdate - pd.Timestamp.now(tz='UTC')
     twodaysago = (-2 * 24 * 3600)
     if dt.total_seconds() < twodaysago:
         if verbose > 0:
@@ -127,10 +300,10 @@ def pair_airnowapi(
         was preprocessed to average observations within half-sized grid cells
         before pairing with the model.
     """
-    import requests
     import pandas as pd
     import os
     import numpy as np
+    from ..util import get_session, lonlat2xy, nearest_values, bias_ratio
 
     if api_key is None:
         # default to home ~/.airnowkey
@@ -146,7 +319,7 @@ def pair_airnowapi(
     bdate = pd.to_datetime(bdate)
     edate = bdate + pd.to_timedelta('3599s')
     if montype in (1, 2):
-        now = pd.to_datetime('now', utc=True).floor('1d')
+        now = pd.Timestamp.now(tz='UTC').floor('1d')
         dt = (now - bdate)
         dtd = dt.total_seconds() / 3600 / 24
         if verbose > 0 and dtd > 2:
@@ -156,22 +329,26 @@ def pair_airnowapi(
                 + ' reliable.'
             )
     bbox_str = '{},{},{},{}'.format(*bbox)
-    r = requests.get(
+    r = get_session().get(
         'https://www.airnowapi.org/aq/data/?'
         f'startDate={bdate:%Y-%m-%dT%H}&endDate={edate:%Y-%m-%dT%H}'
         + f'&parameters={spc.upper()}&BBOX={bbox_str}&'
         + f'dataType=C&format=application/json&verbose=1&monitorType={montype}'
-        + f'&includerawconcentrations=1&API_KEY={api_key}')
-    df = pd.DataFrame.from_records(r.json())
-    df = df.replace(-999., np.nan)
-    df['x'], df['y'] = proj(df['Longitude'].values, df['Latitude'].values)
-    df[var.name] = var.sel(
-        x=df['x'].to_xarray(), y=df['y'].to_xarray(), method='nearest'
-    ).values
+        + f'&includerawconcentrations=1&API_KEY={api_key}',
+        timeout=(5, 120)
+    )
+    df = pd.DataFrame(_loadjson(r))
+    df = _nanmissing(df)
+    df['x'], df['y'] = lonlat2xy(
+        proj, df['Longitude'].values, df['Latitude'].values
+    )
+    df[var.name] = nearest_values(var, df['x'], df['y'])
     df[spc] = df['RawConcentration']
-    df['BIAS'] = df[var.name] - df[spc]
-    df['RATIO'] = df[var.name] / df[spc]
-    return df.query(f'{var.name} == {var.name} and {spc} == {spc}')
+    df['BIAS'], df['RATIO'] = bias_ratio(
+        df[var.name], df[spc]
+    )
+    keep = df[[var.name, spc]].notna().all(axis=1).to_numpy()
+    return df.take(np.flatnonzero(keep))
 
 
 def pair_airnowaqobsfile(bdate, bbox, proj, var, spc):
@@ -205,27 +382,32 @@ def pair_airnowaqobsfile(bdate, bbox, proj, var, spc):
         was preprocessed to average observations within half-sized grid cells
         before pairing with the model.
     """
-    import pandas as pd
+    import numpy as np
+    from ..util import lonlat2xy, nearest_values, bias_ratio
 
     url = (
         'https://files.airnowtech.org/airnow/'
         + f'{bdate:%Y/%Y%m%d/HourlyAQObs_%Y%m%d%H}.dat'
     )
     spckey = {'pm25': 'PM25', 'ozone': 'OZONE'}[spc.lower()]
-    df = pd.read_csv(url, encoding='latin1').query(
-        f'{spckey}_Measured == 1 and {spckey} == {spckey}'
-        + f' and Latitude >= {bbox[1]} and Latitude <= {bbox[3]}'
-        + f' and Longitude >= {bbox[0]} and Longitude <= {bbox[2]}'
+    df = _read_csv(url, filedate=bdate, encoding='latin1')
+    keep = (
+        (df[f'{spckey}_Measured'] == 1) & df[spckey].notna()
+        & (df['Latitude'] >= bbox[1]) & (df['Latitude'] <= bbox[3])
+        & (df['Longitude'] >= bbox[0]) & (df['Longitude'] <= bbox[2])
+    ).to_numpy()
+    df = df.take(np.flatnonzero(keep))
+    df['x'], df['y'] = lonlat2xy(
+        proj, df['Longitude'].values, df['Latitude'].values
     )
-    df['x'], df['y'] = proj(df['Longitude'].values, df['Latitude'].values)
-    df[var.name] = var.sel(
-        x=df['x'].to_xarray(), y=df['y'].to_xarray(), method='nearest'
-    ).values
+    df[var.name] = nearest_values(var, df['x'], df['y'])
     df[spc] = df[spckey]
-    df['BIAS'] = df[var.name] - df[spc]
-    df['RATIO'] = df[var.name] / df[spc]
+    df['BIAS'], df['RATIO'] = bias_ratio(
+        df[var.name], df[spc]
+    )
 
-    return df.query(f'{var.name} == {var.name} and {spc} == {spc}')
+    keep = df[[var.name, spc]].notna().all(axis=1).to_numpy()
+    return df.take(np.flatnonzero(keep))
 
 
 def pair_airnowhourlydatafile(bdate, bbox, proj, var, spc):
@@ -259,50 +441,42 @@ def pair_airnowhourlydatafile(bdate, bbox, proj, var, spc):
         was preprocessed to average observations within half-sized grid cells
         before pairing with the model.
     """
-    import pandas as pd
+    import numpy as np
+    from ..util import lonlat2xy, nearest_values, bias_ratio
     spckey = {'pm25': 'PM2.5'}[spc]
     airnowroot = 'https://files.airnowtech.org/airnow'
-    airnowsitecols = (
-        'AQSID|parameter_name|site_code|site_name|status|agency_id'
-        + '|agency_name|EPA_region|Latitude|Longitude|elevation|GMT_offset'
-        + '|country_code|d1|d2|MSA_code|MSA_name|state_code|state_name'
-        + '|county_code|county_name|d3|d4'
-    ).split('|')
-    sitemetadf = pd.read_csv(
-        f'{airnowroot}/{bdate:%Y/%Y%m%d}/monitoring_site_locations.dat',
-        encoding='latin1', delimiter='|',
-        names=airnowsitecols
-    ).query('parameter_name == "PM2.5"').groupby('AQSID').first().reset_index()
+    sitemetadf = _airnowsitemeta(f'{bdate:%Y%m%d}', spckey)
+    # Sites outside the bbox cannot match, so drop them before the merge
+    sitemetadf = sitemetadf.loc[
+        (sitemetadf['Latitude'] >= bbox[1])
+        & (sitemetadf['Latitude'] <= bbox[3])
+        & (sitemetadf['Longitude'] >= bbox[0])
+        & (sitemetadf['Longitude'] <= bbox[2])
+    ]
 
     airnowobscols = (
         "valid_date|valid_time|AQSID|sitename|GMT_offset|parameter_name"
         + "|reporting_units|obs_value|data_source"
     ).split('|')
-    obsonlydf = pd.read_csv(
+    obsonlydf = _read_csv(
         f'{airnowroot}/{bdate:%Y/%Y%m%d/HourlyData_%Y%m%d%H}.dat',
-        encoding='latin1', delimiter='|', names=airnowobscols
-    ).query(
-        f'parameter_name == "{spckey}"'
+        filedate=bdate, encoding='latin1', delimiter='|', names=airnowobscols,
+        dtype={'AQSID': str, 'parameter_name': 'category'}
     )
-    obsonlydf['AQSID'] = obsonlydf['AQSID'].astype(str)
-    sitemetadf['AQSID'] = sitemetadf['AQSID'].astype(str)
-    df = obsonlydf.merge(
-        sitemetadf.loc[:, ['AQSID', 'agency_name', 'Latitude', 'Longitude']],
-        on='AQSID', how='inner'
-    ).query(
-        f'parameter_name == "{spckey}"'
-        + f' and Latitude >= {bbox[1]} and Latitude <= {bbox[3]}'
-        + f' and Longitude >= {bbox[0]} and Longitude <= {bbox[2]}'
+    keep = (obsonlydf['parameter_name'] == spckey).to_numpy()
+    obsonlydf = obsonlydf.take(np.flatnonzero(keep))
+    df = obsonlydf.merge(sitemetadf, on='AQSID', how='inner')
+    df['x'], df['y'] = lonlat2xy(
+        proj, df['Longitude'].values, df['Latitude'].values
     )
-    df['x'], df['y'] = proj(df['Longitude'].values, df['Latitude'].values)
-    df[var.name] = var.sel(
-        x=df['x'].to_xarray(), y=df['y'].to_xarray(), method='nearest'
-    ).values
+    df[var.name] = nearest_values(var, df['x'], df['y'])
     df[spc] = df['obs_value']
-    df['BIAS'] = df[var.name] - df[spc]
-    df['RATIO'] = df[var.name] / df[spc]
+    df['BIAS'], df['RATIO'] = bias_ratio(
+        df[var.name], df[spc]
+    )
 
-    return df.query(f'{var.name} == {var.name} and {spc} == {spc}')
+    keep = df[[var.name, spc]].notna().all(axis=1).to_numpy()
+    return df.take(np.flatnonzero(keep))
 
 
 def pair_airnowrsig(bdate, bbox, proj, var, spc):
@@ -353,11 +527,13 @@ def pair_aqsapi(bdate, bbox, proj, var, spc, api_user=None, api_key=None):
         was preprocessed to average observations within half-sized grid cells
         before pairing with the model.
     """
-    import requests
+    from concurrent.futures import ThreadPoolExecutor
     import pandas as pd
     import os
     import numpy as np
-    from .util import read_netrc
+    from ..util import (
+        get_session, read_netrc, lonlat2xy, nearest_values, bias_ratio
+    )
 
     if api_key is None:
         keypath = os.path.expanduser('~/.aqskey')
@@ -372,33 +548,40 @@ def pair_aqsapi(bdate, bbox, proj, var, spc, api_user=None, api_key=None):
     api_user, dummy, api_key = read_netrc(api_key, 'aqs.epa.gov')
 
     params = {'ozone': [44201], 'pm25': []}[spc]
-    dfs = []
-    for param in params:
-        r = requests.get(
-            'https://aqs.epa.gov/data/api/sampleData/byBox'
-            + f'?email={api_user}&key={api_key}&'
-            + f'&param={param}&bdate={bdate:%Y%m%d}&edate={bdate:%Y%m%d}'
-            + '&minlat={}&maxlat={}&minlon={}&maxlon={}'.format(*bbox)
-        )
-        df = pd.DataFrame.from_records(r.json()['Data'])
-        dfs.append(df)
+    urls = [
+        'https://aqs.epa.gov/data/api/sampleData/byBox'
+        + f'?email={api_user}&key={api_key}&'
+        + f'&param={param}&bdate={bdate:%Y%m%d}&edate={bdate:%Y%m%d}'
+        + '&minlat={}&maxlat={}&minlon={}&maxlon={}'.format(*bbox)
+        for param in params
+    ]
+    session = get_session()
+
+    def getdata(url):
+        r = session.get(url, timeout=(5, 120))
+        r.raise_for_status()
+        return pd.DataFrame(_loadjson(r)['Data'])
+
+    # Parameters are independent requests, so fetch them concurrently
+    with ThreadPoolExecutor(max_workers=max(1, min(8, len(urls)))) as ex:
+        dfs = list(ex.map(getdata, urls))
     df = pd.concat(dfs, ignore_index=True)
-    df = df.replace(-999., np.nan)
-    df['x'], df['y'] = proj(df['longitude'].values, df['latitude'].values)
-    df[var.name] = var.sel(
-        x=df['x'].to_xarray(), y=df['y'].to_xarray(), method='nearest'
-    ).values
+    df = _nanmissing(df)
+    df['x'], df['y'] = lonlat2xy(
+        proj, df['longitude'].values, df['latitude'].values
+    )
+    df[var.name] = nearest_values(var, df['x'], df['y'])
     df[spc] = df['sample_measurement']
     if spc == 'ozone':
-        factor = df['units_of_measure'].apply(
-            lambda x: {'Parts per million': 1000}.get(x, 1)
-        )
-        df[spc] = df[spc] * factor
+        ppm = (df['units_of_measure'] == 'Parts per million').to_numpy()
+        df[spc] = np.where(ppm, df[spc].to_numpy() * 1000, df[spc].to_numpy())
 
-    df['BIAS'] = df[var.name] - df[spc]
-    df['RATIO'] = df[var.name] / df[spc]
+    df['BIAS'], df['RATIO'] = bias_ratio(
+        df[var.name], df[spc]
+    )
 
-    return df.query(f'{var.name} == {var.name} and {spc} == {spc}')
+    keep = df[[var.name, spc]].notna().all(axis=1).to_numpy()
+    return df.take(np.flatnonzero(keep))
 
 
 def pair_rsig(bdate, bbox, proj, var, spc, src):
@@ -423,28 +606,23 @@ def pair_rsig(bdate, bbox, proj, var, spc, src):
         filtered so that only rows with Model are returned. This is important
         because otherwise eVNA and aVNA are invalid.
     """
-    import pyrsig
     import pandas as pd
+    import numpy as np
+    from ..util import get_rsigdf, lonlat2xy, nearest_values, bias_ratio
 
     bdate = pd.to_datetime(bdate)
     edate = bdate + pd.to_timedelta('3599s')
 
     outdir = f'{bdate:%Y/%m/%d}'
-    rsigapi = pyrsig.RsigApi(
-        bbox=bbox, workdir=outdir
-    )
-    andf = rsigapi.to_dataframe(
-        f'{src}.{spc}', bdate=bdate, edate=edate, unit_keys=False,
-        parse_dates=True
-    )
-    andf = andf.loc[~andf[spc].isnull()].copy()
+    andf = get_rsigdf(f'{src}.{spc}', bbox, outdir, bdate, edate)
+    andf = andf.take(np.flatnonzero(andf[spc].notna().to_numpy()))
 
-    andf['x'], andf['y'] = proj(
-        andf['LONGITUDE'].values, andf['LATITUDE'].values
+    andf['x'], andf['y'] = lonlat2xy(
+        proj, andf['LONGITUDE'].values, andf['LATITUDE'].values
+    )
+    andf[var.name] = nearest_values(var, andf['x'], andf['y'])
+    andf['BIAS'], andf['RATIO'] = bias_ratio(
+        andf[var.name], andf[spc]
     )
-    andf[var.name] = var.sel(
-        x=andf['x'].to_xarray(), y=andf['y'].to_xarray(), method='nearest'
-    ).values
-    andf['BIAS'] = andf[var.name] - andf[spc]
-    andf['RATIO'] = andf[var.name] / andf[spc]
-    return andf.query(f'{var.name} == {var.name} and {spc} == {spc}').copy()
+    keep = andf[[var.name, spc]].notna().all(axis=1).to_numpy()
+    return andf.take(np.flatnonzero(keep))
@@ -31,34 +31,60 @@ def pair_goes(bdate, bbox, proj, var, spc, verbose=1, goeskey='both'):
         was preprocessed to average observations within half-sized grid cells
         before pairing with the model.
     """
-    import pyproj
     import pandas as pd
     from ..mod import get_goesgwr
 
     assert (spc == 'pm25')
 
-    # For a single variable, set appropriate dimensions
-    # For both or bothdnn, apply to individual variables and concatenate.
-    if goeskey in ('pm25gwr_ge', 'pm25dnn_ge'):
-        xkey = 'xdim_ge'
-        ykey = 'ydim_ge'
-    elif goeskey in ('pm25gwr_gw', 'pm25dnn_gw'):
-        xkey = 'xdim_gw'
-        ykey = 'ydim_gw'
-    elif goeskey == 'both':
-        gedf = pair_goes(bdate, bbox, proj, var, spc, verbose, 'pm25gwr_ge')
-        gwdf = pair_goes(bdate, bbox, proj, var, spc, verbose, 'pm25gwr_gw')
-        return pd.concat([gedf, gwdf], ignore_index=True)
-    elif goeskey == 'bothdnn':
-        gedf = pair_goes(bdate, bbox, proj, var, spc, verbose, 'pm25dnn_ge')
-        gwdf = pair_goes(bdate, bbox, proj, var, spc, verbose, 'pm25dnn_gw')
-        return pd.concat([gedf, gwdf], ignore_index=True)
-    else:
+    # For both or bothdnn, pair individual variables and concatenate. Both
+    # variables are read from one call so the file is fetched and opened
+    # only once.
+    goeskeys = {
+        'both': ['pm25gwr_ge', 'pm25gwr_gw'],
+        'bothdnn': ['pm25dnn_ge', 'pm25dnn_gw'],
+    }.get(goeskey, [goeskey])
+    validkeys = ('pm25gwr_ge', 'pm25gwr_gw', 'pm25dnn_ge', 'pm25dnn_gw')
+    if not all(k in validkeys for k in goeskeys):
         raise KeyError('must be either pm25gwr_ge or pm25gwr_gw')
 
-    goesv = get_goesgwr(bdate, key=spc, varkey=goeskey, bbox=bbox).rename(
-        x=xkey, y=ykey
-    )
+    goesvs = get_goesgwr(bdate, key=spc, varkey=goeskeys, bbox=bbox)
+    dfs = [_pair_goesv(goesv, proj, var, spc) for goesv in goesvs]
+    if len(dfs) == 1:
+        return dfs[0]
+
+    return pd.concat(dfs, ignore_index=True)
+
+
+def _pair_goesv(goesv, proj, var, spc):
+    """
+    Pair one GOES variable from get_goesgwr with model variable (var)
+
+    Arguments
+    ---------
+    goesv : xr.DataArray
+        GOES variable (e.g., pm25gwr_ge) with crs_proj4 attribute
+    proj : pyproj.Proj
+        Projection of the model variable (var)
+    var : xr.DataArray
+        Model variable with values on centers
+    spc : str
+        Name of the species
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        Dataframe with values for (x, y, spc, Model, BIAS, RATIO) where the
+        Model is valid
+    """
+    import pyproj
+    import numpy as np
+    from ..util import lonlat2xy, nearest_values, bias_ratio
+
+    goeskey = goesv.name
+    # _ge or _gw sets the dimension names
+    xkey = 'xdim' + goeskey[-3:]
+    ykey = 'ydim' + goeskey[-3:]
+    goesv = goesv.rename(x=xkey, y=ykey)
     gproj = pyproj.Proj(goesv.attrs['crs_proj4'])
 
     goesvdf = goesv.to_dataframe().dropna()
@@ -67,14 +93,13 @@ def pair_goes(bdate, bbox, proj, var, spc, verbose=1, goeskey='both'):
 
     glon, glat = gproj(gx.values, gy.values, inverse=True)
 
-    goesvdf['x'], goesvdf['y'] = proj(glon, glat)
-    xidx = goesvdf.reset_index()['x'].to_xarray()
-    yidx = goesvdf.reset_index()['y'].to_xarray()
-    goesvdf[var.name] = var.sel(x=xidx, y=yidx, method='nearest').values
+    goesvdf['x'], goesvdf['y'] = lonlat2xy(proj, glon, glat)
+    goesvdf[var.name] = nearest_values(var, goesvdf['x'], goesvdf['y'])
     goesvdf[spc] = goesvdf[goeskey]
 
-    # replace with concatenation of east and west.
     df = goesvdf
-    df['BIAS'] = df[var.name] - df[spc]
-    df['RATIO'] = df[var.name] / df[spc]
-    return df.query(f'{var.name} == {var.name}').reset_index()
+    df['BIAS'], df['RATIO'] = bias_ratio(
+        df[var.name], df[spc]
+    )
+    keep = df[var.name].notna().to_numpy()
+    return df.take(np.flatnonzero(keep)).reset_index()
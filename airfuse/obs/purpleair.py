@@ -1,6 +1,32 @@
 __all__ = ['pair_purpleair']
 
 
+def _cutlabeledges(bins, precision=3):
+    """
+    Bin edges rounded as in pd.cut interval labels (precision decimals or,
+    for edges between -1 and 1, precision significant digits).
+
+    Arguments
+    ---------
+    bins : np.ndarray
+        Bin edges
+    precision : int
+        pd.cut precision
+
+    Returns
+    -------
+    edges : np.ndarray
+        Rounded bin edges
+    """
+    import numpy as np
+
+    frac, whole = np.modf(bins)
+    digits = np.full(bins.shape, precision)
+    small = (whole == 0) & (frac != 0) & np.isfinite(bins)
+    digits[small] += -np.floor(np.log10(np.abs(frac[small]))).astype('i') - 1
+    return np.array([np.around(b, d) for b, d in zip(bins, digits)])
+
+
 def pair_purpleair(bdate, bbox, proj, var, spc, api_key=None):
     """
     Arguments
@@ -29,10 +55,10 @@ def pair_purpleair(bdate, bbox, proj, var, spc, api_key=None):
         was preprocessed to average observations within half-sized grid cells
         before pairing with the model.
     """
-    import pyrsig
     import pandas as pd
     import numpy as np
     import os
+    from ..util import get_rsigdf, lonlat2xy, nearest_values, bias_ratio
 
     assert (spc == 'pm25')
     outdir = f'{bdate:%Y/%m/%d}'
@@ -48,45 +74,64 @@ def pair_purpleair(bdate, bbox, proj, var, spc, api_key=None):
     elif os.path.exists(api_key):
         api_key = open(api_key, 'r').read().strip()
 
-    rsigapi = pyrsig.RsigApi(
-        bbox=bbox, workdir=outdir
-    )
-    rsigapi.purpleair_kw['api_key'] = api_key
-    padf = rsigapi.to_dataframe(
-        'purpleair.pm25_corrected', bdate=bdate, edate=edate,
-        unit_keys=False, parse_dates=True
+    padf = get_rsigdf(
+        'purpleair.pm25_corrected', bbox, outdir, bdate, edate,
+        api_key=api_key
     ).rename(columns=dict(pm25_corrected_hourly=spc))
 
     # A much more complex analysis of error effectively only excludes
     # values over 1000. For simplicity, here we exclude measurements
-    # greater than or equal too 1000 micrograms/m3.
-    padf = padf.loc[~padf[spc].isnull()].query(f'{spc} < 1000').copy()
+    # greater than or equal too 1000 micrograms/m3 (NaN fails < too).
+    keep = (padf[spc] < 1000).to_numpy()
+    padf = padf.take(np.flatnonzero(keep))
 
-    padf['x'], padf['y'] = proj(
-        padf['LONGITUDE'].values, padf['LATITUDE'].values
+    padf['x'], padf['y'] = lonlat2xy(
+        proj, padf['LONGITUDE'].values, padf['LATITUDE'].values
     )
 
     # Calculate PA values at 1/2 sized grid boxes (2.5km)
     hcell = 5.079 / 4
     xbins = np.linspace(
-        var.x.min() - hcell, var.x.max() + hcell, var.x.size * 2
+        float(var.x.min()) - hcell, float(var.x.max()) + hcell,
+        var.x.size * 2
     )
     ybins = np.linspace(
-        var.y.min() - hcell, var.y.max() + hcell, var.y.size * 2
+        float(var.y.min()) - hcell, float(var.y.max()) + hcell,
+        var.y.size * 2
+    )
+
+    # Integer bin ids match pd.cut: bin i holds (bins[i], bins[i + 1]].
+    # Values outside of the bins are dropped as pd.cut NaN would be.
+    # COL and ROW are mid-points of the rounded pd.cut label edges.
+    xedges = _cutlabeledges(xbins)
+    yedges = _cutlabeledges(ybins)
+    xmids = ((xedges[:-1] + xedges[1:]) / 2).astype('f')
+    ymids = ((yedges[:-1] + yedges[1:]) / 2).astype('f')
+    ix = np.searchsorted(xbins, padf['x'].values) - 1
+    iy = np.searchsorted(ybins, padf['y'].values) - 1
+    inbins = (ix >= 0) & (ix < xmids.size) & (iy >= 0) & (iy < ymids.size)
+    # One int64 cell id per row; sorted unique ids keep the (COL, ROW) row
+    # order of a groupby, which fixes the CV folds downstream. Sums over
+    # cells are one np.bincount pass per column.
+    gid = ix[inbins].astype('i8') * ymids.size + iy[inbins]
+    gid, inv = np.unique(gid, return_inverse=True)
+    n = np.bincount(inv)
+
+    def cellsum(key):
+        return np.bincount(inv, weights=padf[key].values[inbins])
+
+    paadf = pd.DataFrame({
+        'COL': xmids[gid // ymids.size], 'ROW': ymids[gid % ymids.size],
+        'x': cellsum('x') / n, 'y': cellsum('y') / n,
+        'COUNT': cellsum('COUNT').astype(padf['COUNT'].dtype),
+        spc: cellsum(spc) / n,
+    })
+    paadf = paadf.take(np.flatnonzero((paadf[spc] > 0).to_numpy()))
+    paadf = paadf.reset_index(drop=True)
+    paadf[var.name] = nearest_values(var, paadf['x'], paadf['y'])
+    paadf['BIAS'], paadf['RATIO'] = bias_ratio(
+        paadf[var.name], paadf[spc]
     )
 
-    col = pd.cut(padf['x'], xbins).apply(lambda x: x.mid).astype('f')
-    col.name = 'COL'
-    row = pd.cut(padf['y'], ybins).apply(lambda x: x.mid).astype('f')
-    row.name = 'ROW'
-    paadf = padf.groupby([col, row]).agg(
-        x=('x', 'mean'), y=('y', 'mean'),
-        COUNT=('COUNT', 'sum'), pm25=('pm25', 'mean')
-    ).query(f'{spc} > 0').reset_index()
-    paadf[var.name] = var.sel(
-        x=paadf['x'].to_xarray(), y=paadf['y'].to_xarray(), method='nearest'
-    ).values
-    paadf['BIAS'] = paadf[var.name] - paadf[spc]
-    paadf['RATIO'] = paadf[var.name] / paadf[spc]
-
-    return paadf.query(f'{var.name} == {var.name}').copy()
+    keep = paadf[var.name].notna().to_numpy()
+    return paadf.take(np.flatnonzero(keep))
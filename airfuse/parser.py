@@ -1,17 +1,26 @@
 __all__ = ['get_parser', 'parse_args']
 
+import functools
+
 
 def str2bbox(bboxstr):
-    import numpy as np
-    return np.array(bboxstr.split(','), dtype='f')
+    """Parse lllon,lllat,urlon,urlat into a tuple of floats"""
+    return tuple(float(v) for v in bboxstr.split(','))
+
+
+def str2date(datestr):
+    """Parse a date with pandas, which is only imported when called"""
+    import pandas as pd
+    return pd.to_datetime(datestr)
 
 
+@functools.lru_cache(maxsize=1)
 def get_parser():
     """
-    Create a parser object that can be used by pm.py or ozone.py
+    Create a parser object that can be used by pm.py or ozone.py. The parser
+    is built once and reused by later calls.
     """
     import argparse
-    import pandas as pd
 
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -48,11 +57,15 @@ def get_parser():
     )
     parser.add_argument('-a', '--api-key', help='PurpleAir API Key')
     parser.add_argument(
-        '-f', '--format', choices={'csv', 'nc'}, default='csv',
-        help='Output format csv or NetCDF (nc)'
+        '-f', '--format', choices={'csv', 'nc', 'parquet'}, default='csv',
+        help='Output format csv, NetCDF (nc), or parquet (needs pyarrow)'
+    )
+    parser.add_argument(
+        '-j', '--njobs', default=None, type=int,
+        help='Apply fusion models concurrently with njobs threads'
     )
     hstr = 'Start Date YYYY-MM-DDTHHZ of obs and model'
-    parser.add_argument('startdate', type=pd.to_datetime, help=hstr)
+    parser.add_argument('startdate', type=str2date, help=hstr)
     return parser
 
 
@@ -1,12 +1,11 @@
 __all__ = ['pmfuse']
 
 from .mod import get_model
-from .obs import pair_airnow, pair_purpleair
-from .models import applyfusion, get_fusions
-from .ensemble import distweight
-from .util import df2nc
+from .obs import pair_batch
+from .models import applyfusions, get_fusions
+from .ensemble import distweights
+from .util import df2nc, valid_dataframe
 import numpy as np
-import time
 import pyproj
 import os
 import logging
@@ -17,7 +16,8 @@ import pandas as pd
 
 def pmfuse(
     startdate, model, bbox=None, cv_only=False,
-    outdir=None, overwrite=False, api_key=None, verbose=0, **kwds
+    outdir=None, overwrite=False, api_key=None, verbose=0, njobs=None,
+    **kwds
 ):
 
     date = pd.to_datetime(startdate)
@@ -66,11 +66,13 @@ nearest obs.
         'logpath': logpath
     }
 
-    found = {k: os.path.exists(p) for k, p in outpaths.items()}
     chks = ['anevalpath', 'paevalpath', 'outpath']
 
-    if any([found[k] for k in chks]) and not overwrite:
-        foundstr = ' '.join([outpaths[k] for k, v in found.items() if v])
+    # Stop at the first existing output; only list all outputs to warn
+    if not overwrite and any(os.path.exists(outpaths[k]) for k in chks):
+        foundstr = ' '.join(
+            [p for p in outpaths.values() if os.path.exists(p)]
+        )
         warnings.warn(
             f'Outputs exist; delete or use -O to continue:\n{foundstr}'
         )
@@ -89,17 +91,23 @@ nearest obs.
     # than half the diagonal distance. Thsi ensures that AirNow will be the
     # preferred estimate within a grid cell if it exists. This is particularly
     # reasonable given that the PA coordinates are averaged
-    dx = np.diff(pm.x).mean()
-    dy = np.diff(pm.y).mean()
+    # Mean spacing; the sum of differences telescopes to last - first
+    x = pm.x.values
+    y = pm.y.values
+    dx = float(x[-1] - x[0]) / (x.size - 1)
+    dy = float(y[-1] - y[0]) / (y.size - 1)
     pamindist = ((dx**2 + dy**2)**.5) / 2
 
     proj = pyproj.Proj(pm.attrs['crs_proj4'], preserve_units=True)
     logging.info(proj.srs)
 
-    andf = pair_airnow(date, bbox, proj, pm, obskey)
+    # AirNow and PurpleAir downloads are independent, so run them together
+    andf, padf = pair_batch([
+        (date, bbox, proj, pm, obskey, 'airnow', {}),
+        (date, bbox, proj, pm, obskey, 'purpleair', dict(api_key=api_key)),
+    ], max_workers=2)
     logging.info(f'AirNow N={andf.shape[0]}')
     fdesc = '\n'.join([fdesc, f'AirNow N={andf.shape[0]}'])
-    padf = pair_purpleair(date, bbox, proj, pm, obskey, api_key=api_key)
     logging.info(f'PurpleAir N={padf.shape[0]}')
     fdesc = '\n'.join([fdesc, f'PurpleAir N={padf.shape[0]}'])
 
@@ -108,53 +116,36 @@ nearest obs.
     if cv_only:
         tgtdf = None
     else:
-        outdf = pm.to_dataframe().reset_index()
-        tgtdf = outdf.query(f'{pm.name} == {pm.name}').copy()
+        tgtdf = valid_dataframe(pm)
 
     # Apply all models to AirNow observations
-    for mkey, mod in models.items():
-        logging.info(f'AN {mkey} begin')
-        t0 = time.time()
-        applyfusion(
-            mod, f'{mkey}_AN', andf, tgtdf=tgtdf, obskey=obskey,
-            modkey=pm.name, verbose=9
-        )
-        t1 = time.time()
-        logging.info(f'AN {mkey} {t1 - t0:.0f}s')
+    applyfusions(
+        models, andf, tgtdf=tgtdf, suffix='_AN', njobs=njobs,
+        obskey=obskey, modkey=pm.name, verbose=9
+    )
 
     # Apply all models to PurpleAir observations
-    for mkey, mod in models.items():
-        logging.info(f'PA {mkey} begin')
-        t0 = time.time()
-        applyfusion(
-            mod, f'{mkey}_PA', padf, tgtdf=tgtdf, loodf=andf,
-            obskey=obskey, modkey=pm.name, verbose=9
-        )
-        t1 = time.time()
-        logging.info(f'PA {mkey} finish: {t1 - t0:.0f}s')
+    applyfusions(
+        models, padf, tgtdf=tgtdf, loodf=andf, suffix='_PA', njobs=njobs,
+        obskey=obskey, modkey=pm.name, verbose=9
+    )
 
     # Force PA downweighting in same cell and neighboring cell.
     # Has no effect on LOO because nearest (ie, same cell) is already removed.
     loopaadjdist = np.maximum(andf['LOO_VNA_PA_DIST'], pamindist)
     andf['LOO_VNA_PA_DIST_ADJ'] = loopaadjdist
-    # Perform fusions on LOO data for aVNA
+    # Perform fusions on LOO data for aVNA, eVNA, and aIDW with shared
+    # distance weights
     distkeys = ['LOO_VNA_AN_DIST', 'LOO_VNA_PA_DIST_ADJ']
-    valkeys = ['LOO_aVNA_AN', 'LOO_aVNA_PA']
-    distweight(
-        andf, distkeys, valkeys, modkey=model, ykey='FUSED_aVNA', power=-2,
-        add=True, LOO_aVNA_PA=0.25
-    )
-    # Perform fusions on LOO data for eVNA
-    valkeys = ['LOO_eVNA_AN', 'LOO_eVNA_PA']
-    distweight(
-        andf, distkeys, valkeys, modkey=model, ykey='FUSED_eVNA', power=-2,
-        add=True, LOO_eVNA_PA=0.25
-    )
-    # Perform fusions on LOO data for eVNA
-    valkeys = ['LOO_aIDW_AN', 'LOO_aIDW_PA']
-    distweight(
-        andf, distkeys, valkeys, modkey=model, ykey='FUSED_aIDW', power=-2,
-        add=True, LOO_aIDW_PA=0.25
+    valkeyss = [
+        ['LOO_aVNA_AN', 'LOO_aVNA_PA'],
+        ['LOO_eVNA_AN', 'LOO_eVNA_PA'],
+        ['LOO_aIDW_AN', 'LOO_aIDW_PA'],
+    ]
+    distweights(
+        andf, distkeys, valkeyss, ['FUSED_aVNA', 'FUSED_eVNA', 'FUSED_aIDW'],
+        modkey=model, power=-2, add=True,
+        LOO_aVNA_PA=0.25, LOO_eVNA_PA=0.25, LOO_aIDW_PA=0.25
     )
     # Save results to disk as CSV files
     andf.to_csv(ancvpath, index=False)
@@ -163,19 +154,12 @@ nearest obs.
     if not cv_only:
         # Force PA downweighting in same cell and neighboring cell.
         tgtdf['VNA_PA_DIST_ADJ'] = np.maximum(tgtdf['VNA_PA_DIST'], pamindist)
-        # Perform fusions on Target Dataset for aVNA
-        distkeys = ['VNA_AN_DIST', 'VNA_PA_DIST_ADJ']
-        valkeys = ['aVNA_AN', 'aVNA_PA']
-        distweight(
-            tgtdf, distkeys, valkeys, modkey=model, ykey='FUSED_aVNA',
-            power=-2, add=True, aVNA_PA=0.25
-        )
-        # Perform fusions on Target Dataset for aIDW
+        # Perform fusions on Target Dataset for aVNA and aIDW
         distkeys = ['VNA_AN_DIST', 'VNA_PA_DIST_ADJ']
-        valkeys = ['aIDW_AN', 'aIDW_PA']
-        distweight(
-            tgtdf, distkeys, valkeys, modkey=model, ykey='FUSED_aIDW',
-            power=-2, add=True, aIDW_PA=0.25
+        valkeyss = [['aVNA_AN', 'aVNA_PA'], ['aIDW_AN', 'aIDW_PA']]
+        distweights(
+            tgtdf, distkeys, valkeyss, ['FUSED_aVNA', 'FUSED_aIDW'],
+            modkey=model, power=-2, add=True, aVNA_PA=0.25, aIDW_PA=0.25
         )
         # Save final results to disk
         if fusepath.endswith('.nc'):
@@ -188,8 +172,10 @@ nearest obs.
                 'reftime': metarow['reftime'].strftime('%Y-%m-%dT%H:%M:%S%z'),
                 'sigma': metarow['sigma']
             }
-            tgtds = df2nc(tgtdf, varattrs, fileattrs)
-            tgtds.to_netcdf(fusepath)
+            df2nc(tgtdf, varattrs, fileattrs, outpath=fusepath)
+        elif fusepath.endswith('.parquet'):
+            # requires pyarrow or fastparquet
+            tgtdf.to_parquet(fusepath, index=False)
         else:
             # Defualt to csv
             tgtdf.to_csv(fusepath, index=False)
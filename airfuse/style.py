@@ -1,7 +1,9 @@
 __all__ = [
     'epa_aqi_cmap', 'epa_aqi2_cmap',
     'epa_pmaqi_norm', 'epa_pmaqi2_norm',
-    'epa_o3aqi_norm', 'epa_o3aqi2_norm'
+    'epa_o3aqi_norm', 'epa_o3aqi2_norm',
+    'epa_aqi_bin', 'epa_pmaqi_bin', 'epa_pmaqi2_bin',
+    'epa_o3aqi_bin', 'epa_o3aqi2_bin'
 ]
 
 import matplotlib as mpl
@@ -53,6 +55,41 @@ o3edges2 = np.array([
     0, 27, 54, 62, 70, 77.5, 85, 95, 105, 152.5, 200, 225, 250
 ])
 
+
+def _mkbinner(edges):
+    """
+    Make a function that returns the bin index of values like
+    mc.BoundaryNorm(edges, len(edges) - 1), but without the norm's
+    per-call processing. Useful for classifying whole rasters.
+
+    Arguments
+    ---------
+    edges : array-like
+        Monotonically increasing bin edges
+
+    Returns
+    -------
+    binner : function
+        binner(values) returns an int8 masked array where bin i holds
+        [edges[i], edges[i + 1]), values below edges[0] are -1, values at
+        or above edges[-1] are len(edges) - 1, and NaN values are masked.
+    """
+    edges = np.asarray(edges, dtype='d')
+
+    def binner(values):
+        values = np.ma.masked_invalid(np.asarray(values, dtype='d'))
+        idx = np.searchsorted(edges, values.filled(edges[0]), side='right')
+        return np.ma.masked_array((idx - 1).astype('i1'), mask=values.mask)
+
+    return binner
+
+
+epa_aqi_bin = _mkbinner(aqiedges)
+epa_pmaqi_bin = _mkbinner(pmedges)
+epa_pmaqi2_bin = _mkbinner(pmedges2)
+epa_o3aqi_bin = _mkbinner(o3edges)
+epa_o3aqi2_bin = _mkbinner(o3edges2)
+
 from_list = mc.LinearSegmentedColormap.from_list
 epa_aqi_cmap = from_list('epa_aqi', aqicolors, len(pmedges) - 1)
 epa_aqi_cmap.set_under(aqicolors[0])
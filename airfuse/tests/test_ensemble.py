@@ -0,0 +1,87 @@
+def _distweight(
+    df, distkeys, valkeys, modkey='NAQFC', ykey='FUSED', power=-2, add=True,
+    L=1, k=0.3, x0=125, **scale_kw
+):
+    """
+    distweight as implemented with DataFrame operations before distweights
+    """
+    import numpy as np
+    rename = dict(zip(distkeys, valkeys))
+    dists = df[distkeys].rename(columns=rename)
+    vals = df[valkeys]
+    wgts = (dists**power).where(~vals.isna()).fillna(0)
+    # If a distance was zero, set weight to huge
+    wgts = wgts.where(wgts != np.inf).fillna(1e20)
+    for scalekey, scaleval in scale_kw.items():
+        wgts[scalekey] = wgts[scalekey] * scaleval
+
+    mindist = dists.min(axis=1)
+    totwgt = wgts.sum(axis=1)
+    nwgts = wgts.divide(totwgt, axis=0).fillna(0)
+    bc_wgt = L / (1 + np.exp(k * (mindist - x0)))
+    bc_wgt = bc_wgt.where(totwgt > 0).fillna(0)
+    outdf = nwgts.multiply(bc_wgt, axis=0)
+    outdf[modkey] = (1 - bc_wgt)
+    y = (outdf[valkeys + [modkey]] * df[valkeys + [modkey]]).sum(axis=1).where(
+        ~df[modkey].isna()
+    )
+    outdf = outdf.rename(columns=lambda x: x + '_WGT')
+    outdf[ykey] = y
+    if add:
+        for key in outdf.columns:
+            df[key] = outdf[key]
+
+    return outdf
+
+
+def get_dummydf(n=200, seed=0):
+    """
+    Produce a dummy DataFrame with distances (including 0 and NaN) and
+    values (including NaN) for AN and PA
+    """
+    import numpy as np
+    import pandas as pd
+
+    rs = np.random.RandomState(seed)
+    df = pd.DataFrame(dict(
+        AN_DIST=rs.uniform(0, 300, size=n), PA_DIST=rs.uniform(0, 300, size=n)
+    ))
+    df.loc[:9, 'AN_DIST'] = 0
+    df.loc[5:14, 'PA_DIST'] = 0
+    df.loc[20:29, 'AN_DIST'] = np.nan
+    df.loc[25:34, 'PA_DIST'] = np.nan
+    for key in ['NAQFC', 'aVNA_AN', 'aVNA_PA', 'eVNA_AN', 'eVNA_PA']:
+        df[key] = rs.uniform(0, 50, size=n)
+    df.loc[40:49, 'NAQFC'] = np.nan
+    df.loc[0:60:3, 'aVNA_AN'] = np.nan
+    df.loc[0:60:4, 'aVNA_PA'] = np.nan
+    df.loc[0:60:5, 'eVNA_PA'] = np.nan
+    return df
+
+
+def test_distweights():
+    import pandas as pd
+    from ..ensemble import distweight, distweights
+
+    distkeys = ['AN_DIST', 'PA_DIST']
+    valkeyss = [['aVNA_AN', 'aVNA_PA'], ['eVNA_AN', 'eVNA_PA']]
+    ykeys = ['FUSED_aVNA', 'FUSED_eVNA']
+    for opts in [{}, dict(aVNA_PA=0.25, eVNA_PA=0.5), dict(eVNA_AN=2.)]:
+        for power in [-2, -1]:
+            chkdf = get_dummydf()
+            refdf = chkdf.copy()
+            chks = distweights(
+                chkdf, distkeys, valkeyss, ykeys, power=power, **opts
+            )
+            for valkeys, ykey, chk in zip(valkeyss, ykeys, chks):
+                kw = {k: v for k, v in opts.items() if k in valkeys}
+                ref = _distweight(
+                    refdf, distkeys, valkeys, ykey=ykey, power=power, **kw
+                )
+                pd.testing.assert_frame_equal(chk, ref)
+                chk = distweight(
+                    chkdf.copy(), distkeys, valkeys, ykey=ykey, power=power,
+                    **kw
+                )
+                pd.testing.assert_frame_equal(chk, ref)
+            pd.testing.assert_frame_equal(chkdf, refdf)
@@ -0,0 +1,34 @@
+def test_bboxslices():
+    import os
+    import numpy as np
+    import pyproj
+    import pytest
+    import xarray as xr
+    from ..mod.naqfc import addcrs, bboxslices
+
+    gridpath = os.path.join(
+        os.path.dirname(__file__), '..', '..', 'grid', 'KWBP_GRID.nc'
+    )
+    if not os.path.exists(gridpath):
+        pytest.skip(f'{gridpath} not available')
+    gridds = xr.open_dataset(gridpath).load()
+    addcrs(gridds)
+    srs = gridds.attrs['crs_proj4']
+    # Full grid inverse projection (previous get_mostrecent logic)
+    proj = pyproj.Proj(srs)
+    Y, X = xr.broadcast(gridds.y, gridds.x)
+    LON, LAT = proj(X.values, Y.values, inverse=True)
+    rs = np.random.RandomState(0)
+    for i in range(200):
+        lon0 = rs.uniform(-150, -50)
+        lat0 = rs.uniform(10, 65)
+        bbox = (
+            lon0, lat0, lon0 + rs.uniform(0.1, 40), lat0 + rs.uniform(0.1, 20)
+        )
+        inlon = ((LON >= bbox[0]) & (LON <= bbox[2])).any(0)
+        inlat = ((LAT >= bbox[1]) & (LAT <= bbox[3])).any(1)
+        xslice, yslice = bboxslices(srs, gridds.x, gridds.y, bbox)
+        for mask, sl in [(inlon, xslice), (inlat, yslice)]:
+            chk = np.zeros(mask.size, dtype='bool')
+            chk[sl] = True
+            np.testing.assert_equal(chk, mask, err_msg=str(bbox))
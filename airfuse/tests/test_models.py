@@ -0,0 +1,83 @@
+def get_dummydfs(n=40, seed=0):
+    """
+    Produce dummy fit and target DataFrames on a 500 km square
+    """
+    import numpy as np
+    import pandas as pd
+
+    rs = np.random.RandomState(seed)
+    x = rs.uniform(0, 500, size=n)
+    y = rs.uniform(0, 500, size=n)
+    mod = rs.uniform(5, 15, size=n)
+    obs = mod * rs.uniform(0.5, 1.5, size=n)
+    fitdf = pd.DataFrame(dict(x=x, y=y, obs_value=obs, NAQFC=mod))
+    tgtdf = pd.DataFrame(dict(
+        x=[250., 1500.], y=[250., 1500.], NAQFC=[10., 10.]
+    ))
+    return fitdf, tgtdf
+
+
+def test_idw_maxdist():
+    import numpy as np
+    from ..models import get_fusions, applyfusion
+
+    fitdf, tgtdf = get_dummydfs()
+    # one fit point with no other within 50 km
+    fitdf.loc[0, ['x', 'y']] = [-500., -500.]
+    loodf = tgtdf.copy()
+    loodf['obs_value'] = 10.
+    mod = get_fusions(idw_maxdist=50)['IDW']
+    applyfusion(mod, 'IDW', fitdf, tgtdf=tgtdf, loodf=loodf)
+    ykeys = ['obs_value', 'NAQFC', 'BIAS', 'RATIO']
+    # the far target has no neighbor within the cutoff
+    tgtkeys = [f'IDW_{k}' for k in ykeys] + ['aIDW', 'eIDW']
+    assert np.isnan(tgtdf.loc[1, tgtkeys].astype('d')).all()
+    loodkeys = [f'LOO_IDW_{k}' for k in ykeys] + ['LOO_aIDW', 'LOO_eIDW']
+    assert np.isnan(loodf.loc[1, loodkeys].astype('d')).all()
+    # the isolated fit point has no other neighbor within the cutoff
+    fitkeys = [f'{p}_IDW_{k}' for p in ('CV', 'LOO') for k in ykeys]
+    assert np.isnan(fitdf.loc[0, fitkeys].astype('d')).all()
+    # points with neighbors within the cutoff are predicted
+    assert np.isfinite(tgtdf.loc[0, tgtkeys].astype('d')).all()
+
+
+def test_cross_validate():
+    import copy
+    import numpy as np
+    from ..models import get_fusions, _cross_validate
+
+    fitdf, tgtdf = get_dummydfs()
+    X = fitdf[['x', 'y']].values
+    Y = fitdf[['obs_value', 'NAQFC']].values
+    for mkey, mod in get_fusions(n=10).items():
+        yhat, dist, fold = _cross_validate(mod, X, Y, njobs=2)
+        for j, ykey in enumerate(['obs_value', 'NAQFC']):
+            ref = copy.deepcopy(mod).cross_validate(X, Y[:, j], ykey=ykey)
+            np.testing.assert_allclose(
+                yhat[:, j], ref[f'CV_{ykey}'].values, err_msg=mkey
+            )
+            np.testing.assert_equal(fold, ref[f'CV_{ykey}_fold'].values)
+
+
+def test_applyfusions_njobs():
+    import pandas as pd
+    from ..models import get_fusions, applyfusions
+
+    fitdf, tgtdf = get_dummydfs()
+    loodf = tgtdf.copy()
+    loodf['obs_value'] = [8., 12.]
+    dfs = {}
+    for njobs in [None, 2]:
+        mods = get_fusions(n=10)
+        dfs[njobs] = fitdf.copy(), tgtdf.copy(), loodf.copy()
+        ifitdf, itgtdf, iloodf = dfs[njobs]
+        applyfusions(
+            mods, ifitdf, tgtdf=itgtdf, loodf=iloodf, suffix='_x',
+            njobs=njobs
+        )
+    # includes CV_DIST shared by all models and BIAS/RATIO added lazily
+    assert {'BIAS', 'RATIO', 'CV_DIST'}.issubset(dfs[2][0].columns)
+    assert {'BIAS', 'RATIO'}.issubset(dfs[2][2].columns)
+    for ser, par in zip(dfs[None], dfs[2]):
+        pd.testing.assert_frame_equal(ser, par)
+        assert ser.attrs == par.attrs
@@ -92,3 +92,19 @@ def test_airnowhourlydatafile():
     proj = pyproj.Proj(modvar.crs_proj4)
     obsdf0 = epa.pair_airnowhourlydatafile(date, bbox, proj, modvar, obskey)
     assert (obsdf0.shape[0] > 0)
+
+
+def test_purpleair_cutlabels():
+    import numpy as np
+    import pandas as pd
+    from ..obs.purpleair import _cutlabeledges
+
+    var = get_dummyvar()
+    hcell = 5.079 / 4
+    for c in [var.x.values, var.y.values, np.linspace(-3.3, 2.7, 40)]:
+        bins = np.linspace(c.min() - hcell, c.max() + hcell, c.size * 2)
+        mids = pd.Series((bins[:-1] + bins[1:]) / 2)
+        ref = pd.cut(mids, bins).apply(lambda x: x.mid).astype('f').values
+        edges = _cutlabeledges(bins)
+        chk = ((edges[:-1] + edges[1:]) / 2).astype('f')
+        np.testing.assert_array_equal(chk, ref)
@@ -0,0 +1,34 @@
+def test_binners():
+    import numpy as np
+    import matplotlib.colors as mc
+    from .. import style
+
+    binners = [
+        (style.epa_aqi_bin, style.aqiedges),
+        (style.epa_pmaqi_bin, style.pmedges),
+        (style.epa_pmaqi2_bin, style.pmedges2),
+        (style.epa_o3aqi_bin, style.o3edges),
+        (style.epa_o3aqi2_bin, style.o3edges2),
+    ]
+    for binner, edges in binners:
+        edges = np.asarray(edges, dtype='d')
+        mids = (edges[:-1] + edges[1:]) / 2
+        # below, on, between, and above the edges
+        vals = np.concatenate([
+            [edges[0] - 1], edges, mids, [edges[-1] + 1],
+            np.nextafter(edges, -np.inf), np.nextafter(edges, np.inf)
+        ])
+        # float32 values just below edges (e.g., 35.49999)
+        vals32 = (edges - 1e-5).astype('f')
+        norm = mc.BoundaryNorm(edges, len(edges) - 1)
+        for v in [vals, vals32]:
+            chk = binner(v)
+            ref = norm(v)
+            assert not np.ma.getmaskarray(chk).any()
+            np.testing.assert_equal(chk.filled(-99), ref.filled(-99))
+        chk = binner(edges[[0, -1]] + [-1, 1])
+        np.testing.assert_equal(chk.filled(-99), [-1, len(edges) - 1])
+        # NaN is masked
+        chk = binner([np.nan, mids[0]])
+        np.testing.assert_equal(np.ma.getmaskarray(chk), [True, False])
+        assert chk[1] == 0
@@ -0,0 +1,109 @@
+def get_dummyvar(x, y, seed=0):
+    """
+    Produce a dummy variable with x and y coordinates
+    """
+    import numpy as np
+    import xarray as xr
+
+    rs = np.random.RandomState(seed)
+    vals = rs.uniform(0, 100, size=(2, y.size, x.size))
+    var = xr.DataArray(
+        vals, dims=('time', 'y', 'x'), coords=dict(time=[0, 1], x=x, y=y),
+        name='NAQFC'
+    )
+    return var
+
+
+def _test_nearest_values(x, y, midpoints=False):
+    import numpy as np
+    import xarray as xr
+    from ..util import nearest_values
+
+    var = get_dummyvar(x, y)
+    rs = np.random.RandomState(1)
+    # include points beyond the edges
+    px = rs.uniform(x.min() - 20, x.max() + 20, size=500)
+    py = rs.uniform(y.min() - 20, y.max() + 20, size=500)
+    chk = nearest_values(var, px, py)
+    ref = var.sel(
+        x=xr.DataArray(px, dims=('point',)),
+        y=xr.DataArray(py, dims=('point',)), method='nearest'
+    ).values
+    np.testing.assert_equal(chk, ref)
+    # points with NaN coordinates are NaN
+    px[:10] = np.nan
+    py[5:15] = np.nan
+    chk = nearest_values(var, px, py)
+    assert np.isnan(chk[:, :15]).all()
+    np.testing.assert_equal(chk[:, 15:], ref[:, 15:])
+    if midpoints:
+        # points exactly halfway between cells go to the larger coordinate
+        mx = (x[:-1] + x[1:]) / 2
+        my = (y[:-1] + y[1:]) / 2
+        n = min(mx.size, my.size)
+        px, py = mx[:n], my[:n]
+        chk = nearest_values(var, px, py)
+        ref = var.sel(
+            x=xr.DataArray(px, dims=('point',)),
+            y=xr.DataArray(py, dims=('point',)), method='nearest'
+        ).values
+        np.testing.assert_equal(chk, ref)
+        iy = np.where(y[0] < y[-1], np.arange(1, n + 1), np.arange(n))
+        ix = np.where(x[0] < x[-1], np.arange(1, n + 1), np.arange(n))
+        np.testing.assert_equal(chk, var.values[:, iy, ix])
+
+
+def test_nearest_values_uniform():
+    import numpy as np
+
+    _test_nearest_values(np.arange(-100., 100., 5.079), np.arange(0, 60.))
+
+
+def test_nearest_values_midpoint():
+    import numpy as np
+
+    _test_nearest_values(
+        np.arange(0., 40.), np.arange(30., 0., -1.5), midpoints=True
+    )
+
+
+def test_nearest_values_nonuniform():
+    import numpy as np
+
+    x = np.cumsum(np.random.RandomState(2).uniform(1, 10, size=40))
+    _test_nearest_values(x, np.arange(0, 60.) ** 1.5)
+
+
+def test_nearest_values_descending():
+    import numpy as np
+
+    x = np.arange(100., -100., -5.079)
+    y = np.cumsum(np.random.RandomState(3).uniform(1, 10, size=40))[::-1]
+    _test_nearest_values(x, y)
+
+
+def test_valid_dataframe():
+    import numpy as np
+    from ..util import valid_dataframe
+
+    var = get_dummyvar(np.arange(10.), np.arange(8.))
+    var = var.where(var > 30)
+    var.coords['lon'] = var.x * 2
+    chk = valid_dataframe(var)
+    ref = var.to_dataframe().reset_index()
+    ref = ref.loc[ref['NAQFC'].notnull()]
+    assert chk.columns.tolist() == ref.columns.tolist()
+    assert chk.index.tolist() == ref.index.tolist()
+    assert chk.equals(ref)
+
+
+def test_bias_ratio():
+    import numpy as np
+    import pandas as pd
+    from ..util import bias_ratio
+
+    mod = pd.Series([1., 2., 0., np.nan, 4.])
+    obs = pd.Series([2., 0., 0., 1., np.nan])
+    bias, ratio = bias_ratio(mod, obs)
+    np.testing.assert_equal(bias, (mod - obs).values)
+    np.testing.assert_equal(ratio, (mod / obs).values)
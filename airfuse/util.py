@@ -1,8 +1,145 @@
 __all__ = [
     'get_file', 'wget_file', 'request_file', 'ftp_file', 'read_netrc',
-    'mpestats', 'to_geopandas', 'to_geojson', 'df2nc'
+    'get_session', 'get_cachepath', 'get_rsigapi', 'get_rsigdf', 'lonlat2xy',
+    'nearest_values', 'bias_ratio', 'valid_dataframe', 'mpestats',
+    'to_geopandas', 'to_geojson', 'df2nc'
 ]
 
+import functools
+
+_session = None
+
+
+def get_cachepath(relpath):
+    """
+    Local path for a cached download. Caches are written relative to the
+    working directory unless the AIRFUSE_CACHEDIR environment variable is
+    set to another directory or to 'none' to disable caching.
+
+    Arguments
+    ---------
+    relpath : str
+        Path of the cached file relative to the cache directory
+
+    Returns
+    -------
+    path : str or None
+        Path to read/write the cache or None if caching is disabled
+    """
+    import os
+
+    cachedir = os.environ.get('AIRFUSE_CACHEDIR', '')
+    if cachedir.lower() == 'none':
+        return None
+    return os.path.join(cachedir, relpath)
+
+
+def get_session():
+    """
+    Get a requests.Session shared by all airfuse downloads. The session keeps
+    connections alive (pooled per host) and retries transient server errors,
+    so repeated requests to the same server skip the TCP/TLS handshake.
+
+    Returns
+    -------
+    session : requests.Session
+        Session with pooled and retrying HTTPAdapter mounted for http(s)
+    """
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504]
+        )
+        adapter = HTTPAdapter(
+            pool_connections=16, pool_maxsize=16, max_retries=retry
+        )
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session = session
+
+    return _session
+
+
+def get_rsigapi(bbox, workdir):
+    """
+    Get a pyrsig.RsigApi for bbox and workdir. Instances are reused, so the
+    RSIG server check and HTTP setup happen once per (bbox, workdir) rather
+    than for every hourly pair call.
+
+    Arguments
+    ---------
+    bbox : tuple
+        lower left lon, lower left lat, upper right lon, upper right lat
+    workdir : str
+        Working directory for downloaded files
+
+    Returns
+    -------
+    rsigapi : pyrsig.RsigApi
+        Shared instance; pass dates to its methods rather than setting them.
+    """
+    if bbox is not None:
+        bbox = tuple(bbox)
+    return _get_rsigapi(bbox, workdir)
+
+
+@functools.lru_cache(maxsize=32)
+def _get_rsigapi(bbox, workdir):
+    import pyrsig
+
+    if bbox is not None:
+        bbox = list(bbox)
+    return pyrsig.RsigApi(bbox=bbox, workdir=workdir)
+
+
+def get_rsigdf(key, bbox, workdir, bdate, edate, api_key=None):
+    """
+    Get an RSIG dataset as a DataFrame (unit_keys=False, parse_dates=True).
+    Results are held in memory, so repeated requests for the same key, bbox,
+    and hour are not downloaded or parsed again. Like pyrsig's reuse of files
+    in workdir, the cache does not expire.
+
+    Arguments
+    ---------
+    key : str
+        RSIG key (e.g., airnow.pm25 or purpleair.pm25_corrected)
+    bbox : tuple
+        lower left lon, lower left lat, upper right lon, upper right lat
+    workdir : str
+        Working directory for downloaded files
+    bdate, edate : datelike
+        Beginning and ending dates
+    api_key : str or None
+        If provided, used as the PurpleAir api_key
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        Copy of the cached result that the caller may modify.
+    """
+    import pandas as pd
+
+    if bbox is not None:
+        bbox = tuple(bbox)
+    bdate = pd.to_datetime(bdate)
+    edate = pd.to_datetime(edate)
+    return _get_rsigdf(key, bbox, workdir, bdate, edate, api_key).copy()
+
+
+@functools.lru_cache(maxsize=16)
+def _get_rsigdf(key, bbox, workdir, bdate, edate, api_key):
+    rsigapi = _get_rsigapi(bbox, workdir)
+    if api_key is not None:
+        rsigapi.purpleair_kw['api_key'] = api_key
+    return rsigapi.to_dataframe(
+        key, bdate=bdate, edate=edate, unit_keys=False, parse_dates=True
+    )
+
 
 def get_file(url, local_path, wget=False):
     """
@@ -103,7 +240,6 @@ def request_file(url, local_path):
     local_path : str
         local_path
     """
-    import requests
     import shutil
     import os
 
@@ -111,9 +247,12 @@ def request_file(url, local_path):
         return local_path
 
     os.makedirs(os.path.dirname(local_path), exist_ok=True)
-    with requests.get(url, stream=True) as r:
+    with get_session().get(url, stream=True, timeout=(5, 120)) as r:
+        r.raise_for_status()
+        # raw bypasses requests decoding; undo any gzip transfer
+        r.raw.decode_content = True
         with open(local_path, 'wb') as f:
-            shutil.copyfileobj(r.raw, f)
+            shutil.copyfileobj(r.raw, f, 1 << 20)
 
     return local_path
 
@@ -124,6 +263,179 @@ def read_netrc(netrcpath, server):
     return nf.authenticators(server)
 
 
+@functools.lru_cache(maxsize=8)
+def _lonlat2xytransformer(srs):
+    # Shared across threads (e.g., obs.pair_batch); pyproj>=3.1 Transformers
+    # are thread-safe.
+    import pyproj
+
+    crs = pyproj.CRS(srs)
+    return pyproj.Transformer.from_crs(crs.geodetic_crs, crs, always_xy=True)
+
+
+def lonlat2xy(proj, lon, lat):
+    """
+    Project lon/lat to x/y using a cached pyproj.Transformer. Equivalent to
+    proj(lon, lat) without rebuilding the transformation for each call.
+
+    Arguments
+    ---------
+    proj : pyproj.Proj or pyproj.Transformer
+        Projection of x/y. A Transformer is used as is.
+    lon, lat : array-like
+        Longitude and latitude in decimal degrees
+
+    Returns
+    -------
+    x, y : np.ndarray
+        Projected coordinates
+    """
+    import pyproj
+
+    if isinstance(proj, pyproj.Transformer):
+        transformer = proj
+    else:
+        transformer = _lonlat2xytransformer(proj.srs)
+    return transformer.transform(lon, lat)
+
+
+def _nearest_index(c, v):
+    """
+    Index of the nearest value in monotonic 1-d coordinate c for each v.
+    Ties go to the larger coordinate like pandas' nearest indexer.
+    """
+    import numpy as np
+
+    flip = c[0] > c[-1]
+    if flip:
+        c = c[::-1]
+    v = np.where(np.isfinite(v), v, c[0])
+    i = np.clip(np.searchsorted(c, v), 1, c.size - 1)
+    i = np.where(v - c[i - 1] < c[i] - v, i - 1, i)
+    if flip:
+        i = c.size - 1 - i
+    return i.astype('i8')
+
+
+def nearest_values(var, x, y):
+    """
+    Get values from var in the cells nearest to points (x, y). This is the
+    same as var.sel(x=x, y=y, method='nearest'), but uses integer indexing:
+    closed form when var.x and var.y are uniformly spaced and searchsorted
+    when they are only monotonic.
+
+    Arguments
+    ---------
+    var : xr.DataArray
+        Variable with x and y coordinates (y, x must be the last dimensions)
+    x, y : array-like
+        Point coordinates in the same projection as var
+
+    Returns
+    -------
+    vals : np.ndarray
+        Values of var at each point; NaN where x or y is not finite.
+    """
+    import numpy as np
+    import xarray as xr
+
+    x = np.asarray(x, dtype='d')
+    y = np.asarray(y, dtype='d')
+    idxs = []
+    for key, v in [('y', y), ('x', x)]:
+        c = var[key].values
+        if c.size == 1:
+            idxs.append(np.zeros(v.shape, dtype='i8'))
+            continue
+        dc = (c[-1] - c[0]) / (c.size - 1)
+        diffs = np.diff(c)
+        if np.allclose(diffs, dc):
+            t = (np.where(np.isfinite(v), v, c[0]) - c[0]) / dc
+            # Ties go to the larger coordinate like _nearest_index
+            if dc > 0:
+                i = np.floor(t + 0.5)
+            else:
+                i = np.ceil(t - 0.5)
+            idxs.append(np.clip(i, 0, c.size - 1).astype('i8'))
+        elif (diffs > 0).all() or (diffs < 0).all():
+            idxs.append(_nearest_index(c, v))
+        else:
+            break
+
+    if len(idxs) == 2 and var.dims[-2:] == ('y', 'x'):
+        iy, ix = idxs
+        vals = np.asarray(var.values)[..., iy, ix]
+        bad = ~(np.isfinite(x) & np.isfinite(y))
+        if bad.any():
+            vals = vals.astype('d')
+            vals[..., bad] = np.nan
+    else:
+        vals = var.sel(
+            x=xr.DataArray(x, dims=('point',)),
+            y=xr.DataArray(y, dims=('point',)), method='nearest'
+        ).values
+
+    return vals
+
+
+def bias_ratio(mod, obs):
+    """
+    Calculate the bias (mod - obs) and ratio (mod / obs) reading each input
+    only once as numpy arrays.
+
+    Arguments
+    ---------
+    mod, obs : array-like
+        Model and observed values
+
+    Returns
+    -------
+    bias, ratio : np.ndarray
+        mod - obs and mod / obs (inf or NaN where obs is 0 as in pandas)
+    """
+    import numpy as np
+
+    mod = np.asarray(mod)
+    obs = np.asarray(obs)
+    bias = np.subtract(mod, obs)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.true_divide(mod, obs)
+    return bias, ratio
+
+
+def valid_dataframe(var):
+    """
+    Same as var.to_dataframe().reset_index() filtered to rows where var is
+    not null, but only the valid cells are converted to rows.
+
+    Arguments
+    ---------
+    var : xr.DataArray
+        Named variable (e.g., a model surface)
+
+    Returns
+    -------
+    df : pandas.DataFrame
+        One row per valid cell with dimensions, coordinates, and var. The
+        index is the cell position in var.to_dataframe()
+    """
+    import numpy as np
+    import xarray as xr
+
+    valid = var.notnull().values
+    cellidx = np.nonzero(valid)
+    pts = var.isel({
+        dk: xr.DataArray(di, dims=('point',))
+        for dk, di in zip(var.dims, cellidx)
+    })
+    # Column order of to_dataframe().reset_index() from a single cell
+    keys = var.isel({dk: slice(0, 1) for dk in var.dims}).to_dataframe()
+    keys = keys.reset_index().columns
+    df = pts.to_dataframe().reset_index(drop=True)[keys]
+    df.index = np.flatnonzero(valid.ravel())
+    return df
+
+
 def mpestats(df, refkey='obs'):
     """
     Calculate typical model statistics
@@ -425,6 +737,8 @@ def df2nc(
         File attributes to document the results.
     coordkeys: list
         Names of coordinates (defaults to ['time', 'y', 'x'])
+    outpath: str or None
+        If provided, write tgtds to outpath with zlib compression
 
     Returns
     -------
@@ -456,5 +770,11 @@ def df2nc(
         tgtds['crs'] = xr.DataArray(0, dims=(), attrs=cfattrs)
     tgtds.attrs.setdefault('creation_date', now)
     if outpath is not None:
-        tgtds.to_netcdf(outpath)
+        # Fused surfaces are mostly smooth float32 fields, so light zlib
+        # compression (with the default shuffle) shrinks them cheaply.
+        encoding = {
+            k: dict(zlib=True, complevel=1)
+            for k, v in tgtds.data_vars.items() if v.ndim > 0
+        }
+        tgtds.to_netcdf(outpath, encoding=encoding)
     return tgtds